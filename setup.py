@@ -33,5 +33,6 @@ setuptools.setup(
     package_dir={"": "src"},
     packages=setuptools.find_packages(where="src"),
     install_requires=["django>=3.1", "pydantic>=1.0"],
+    extras_require={"sqlite": ["aiosqlite"], "postgresql": ["asyncpg"], "orjson": ["orjson"], "ujson": ["ujson"]},
     python_requires=">=3.9",
 )
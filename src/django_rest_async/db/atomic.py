@@ -0,0 +1,120 @@
+from functools import partial
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from django_rest_async.db.cache import bump_deleted_versions, bump_model_versions
+from django_rest_async.db.executor import (
+    pin_connection,
+    queue_db_call,
+    resolve_db_calls,
+    run_db_calls,
+    run_in_db_executor,
+    take_db_calls,
+)
+
+
+class AsyncAtomic:
+    """
+    ``async with async_atomic(using=None, savepoint=True, durable=False) as atomic:`` runs the block
+    in a transaction on a pinned connection, nested blocks are savepoints.
+
+    The writes queued with ``atomic.create()``, ``save()``, ``update()``, ``delete()`` and ``add()`` (m2m)
+    run together in one thread hop: when the block exits (with the transaction commit), before any other
+    db call of the block (in the same hop) or when a queued call is awaited for its result.
+    Queued writes do not send the async model signals.
+    """
+
+    def __init__(self, using=None, savepoint=True, durable=False):
+        self.using = using or DEFAULT_DB_ALIAS
+        self.savepoint = savepoint
+        self.durable = durable
+
+    async def __aenter__(self):
+        self._pin = pin_connection(self.using)
+        await self._pin.__aenter__()
+        self._atomic = transaction.atomic(using=self.using, savepoint=self.savepoint, durable=self.durable)
+        # the transaction starts with the first call of the block, in the same hop
+        self._enter = queue_db_call(self.using, self._atomic.__enter__)
+        self._models = set()
+        return self
+
+    def _finish(self, calls, exc_type, exc, tb):
+        if exc_type is not None and self._enter in calls:
+            # nothing of the block ran: its calls are dropped, the calls queued before it still run
+            return run_db_calls(list(islice(calls, calls.index(self._enter))))
+        outcomes = run_db_calls(calls)
+        error = outcomes[-1][1] if outcomes else None
+        if exc_type is None and error is not None:
+            exc_type, exc, tb = type(error), error, error.__traceback__
+        self._atomic.__exit__(exc_type, exc, tb)
+        return outcomes
+
+    async def _exit(self, exc_type, exc, tb):
+        calls = take_db_calls(self.using)
+        try:
+            outcomes = await run_in_db_executor(self.using, self._finish, calls, exc_type, exc, tb)
+        except Exception as e:
+            resolve_db_calls(calls, [(None, e)] * len(calls))
+            raise
+        error = resolve_db_calls(calls, outcomes)
+        if exc_type is not None:
+            for call in islice(calls, len(outcomes), None):
+                call.resolve((None, exc))
+        elif error is not None:
+            raise error
+        else:
+            bump_model_versions(*self._models)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self._exit(exc_type, exc, tb)
+        except BaseException as e:
+            await self._pin.__aexit__(type(e), e, e.__traceback__)
+            raise
+        await self._pin.__aexit__(exc_type, exc, tb)
+        return False
+
+    def _queue(self, fn, *args, **kwargs):
+        return queue_db_call(self.using, fn, *args, **kwargs)
+
+    def create(self, model, **kwargs):
+        """Queues the insert of a new instance and returns it, its pk is set once the queue ran."""
+        instance = model(**kwargs)
+        self.save(instance, force_insert=True)
+        return instance
+
+    def save(self, instance, **kwargs):
+        self._models.add(instance.__class__)
+        return self._queue(partial(instance.save, using=self.using, **kwargs))
+
+    def update(self, queryset, **kwargs):
+        """Queues the update of an async queryset, awaiting the returned call gives the updated rows count."""
+        return self._queue(queryset._execute_sync, "update", queryset._perform(), (), kwargs)
+
+    def delete(self, target):
+        """Queues the delete of an async queryset or of a model instance."""
+        if hasattr(target, "_perform"):
+            return self._queue(target._execute_sync, "delete", target._perform(), (), {})
+
+        def delete_instance():
+            deleted = target.delete(using=self.using)
+            bump_deleted_versions(deleted)
+            return deleted
+
+        return self._queue(delete_instance)
+
+    def add(self, instance, field_name, *objs, **kwargs):
+        """Queues ``add()`` on a m2m manager, e.g. ``atomic.add(book, "tags", tag)``, the book may be queued too."""
+
+        def add_objs():
+            # the manager needs the pk of the instance: it is built when the queue runs
+            manager = getattr(instance, field_name)
+            self._models.add(manager.through)
+            return manager.add(*objs, **kwargs)
+
+        return self._queue(add_objs)
+
+
+def async_atomic(using=None, savepoint=True, durable=False):
+    return AsyncAtomic(using=using, savepoint=savepoint, durable=durable)
@@ -0,0 +1,76 @@
+import asyncio
+
+from django_rest_async.db.cache import get_cached_result
+from django_rest_async.db.executor import get_executor, is_pinned, run_in_db_executor
+from django_rest_async.db.queryset import QueryCall
+
+_missing = object()
+
+
+def _run_query_calls(prepared):
+    outcomes = []
+    for call, qs in prepared:
+        try:
+            outcomes.append((call.queryset._execute_sync(call.method, qs, call.args, call.kwargs), None))
+        except Exception as e:
+            # the queries are independent, a failing one does not stop the others
+            outcomes.append((None, e))
+    return outcomes
+
+
+def _split(entries, using, concurrent):
+    executor = get_executor(using)
+    if not concurrent or executor is None or is_pinned(using):
+        return [entries]
+    size = min(executor._max_workers, len(entries))
+    return [entries[i::size] for i in range(size)]
+
+
+async def async_batch(*calls, concurrent=False, return_exceptions=False):
+    """
+    Runs the lazy reads of async querysets (e.g. ``qs.lazy().count()``, ``other_qs.lazy().first()``) in one thread hop
+    and connection checkout per database alias, the aliases run concurrently.
+    Returns the results in order, like ``asyncio.gather()``: the first error is raised
+    unless ``return_exceptions`` is set.
+
+    With ``concurrent``, the reads of an alias are spread over the threads (and connections)
+    of its ``REST_ASYNC_DB_EXECUTOR`` pool, one hop per thread. The native engine is not used,
+    the results of the cached querysets are read from and stored in their cache.
+    """
+    for call in calls:
+        if not isinstance(call, QueryCall):
+            if asyncio.iscoroutine(call):
+                call.close()
+            raise TypeError(f"async_batch takes the lazy reads of qs.lazy(), got {call!r}")
+    outcomes = [None] * len(calls)
+    cache_keys = {}
+    by_alias = {}
+    for index, call in enumerate(calls):
+        qs = call.queryset._perform()
+        if call.queryset._is_prefetched(call.method, qs):
+            outcomes[index] = (call.queryset._execute_sync(call.method, qs, call.args, call.kwargs), None)
+            continue
+        cache_key = call.queryset._get_cache_key(call.method, qs, call.args, call.kwargs)
+        if cache_key is not None:
+            result = get_cached_result(cache_key, _missing)
+            if result is not _missing:
+                outcomes[index] = (result, None)
+                continue
+            cache_keys[index] = cache_key
+        by_alias.setdefault(qs.db, []).append((index, call, qs))
+
+    hops = []
+    for using, entries in by_alias.items():
+        for group in _split(entries, using, concurrent):
+            hops.append((group, run_in_db_executor(using, _run_query_calls, [(call, qs) for _, call, qs in group])))
+    results = await asyncio.gather(*[hop for _, hop in hops])
+    for (group, _), group_outcomes in zip(hops, results):
+        for (index, call, _), outcome in zip(group, group_outcomes):
+            outcomes[index] = outcome
+            if index in cache_keys and outcome[1] is None:
+                call.queryset._set_cached_result(cache_keys[index], outcome[0])
+
+    for result, error in outcomes:
+        if error is not None and not return_exceptions:
+            raise error
+    return [result if error is None else error for result, error in outcomes]
@@ -0,0 +1,235 @@
+import contextvars
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet, SynchronousOnlyOperation
+from django.db.models.sql import Query
+
+from django_rest_async.settings import REST_ASYNC_QUERY_CACHE, REST_ASYNC_QUERY_CACHE_SIZE, REST_ASYNC_QUERY_CACHE_TTL
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with a ttl per entry."""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl if ttl is not None else None, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCache:
+    """
+    A Django cache backend (``CACHES`` alias) with the ``LocalCache`` interface, keys are hashed.
+    The table versions are stored in the backend too, so a write bumps them for every process sharing it.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def _make_key(self, key):
+        return "django_rest_async:" + hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def get(self, key, default=None):
+        return self.cache.get(self._make_key(key), default)
+
+    def set(self, key, value, ttl=None):
+        self.cache.set(self._make_key(key), value, ttl)
+
+    def clear(self):
+        self.cache.clear()
+
+    def _make_version_key(self, table):
+        return self._make_key(("table_version", table))
+
+    def get_versions(self, tables):
+        keys = {table: self._make_version_key(table) for table in tables}
+        values = self.cache.get_many(keys.values())
+        missing = [key for key in keys.values() if key not in values]
+        if missing:
+            # a version evicted from the backend starts again above every value it had before
+            for key in missing:
+                self.cache.add(key, time.time_ns(), None)
+            values.update(self.cache.get_many(missing))
+        return {table: values.get(key, 0) for table, key in keys.items()}
+
+    def bump_versions(self, tables):
+        for table in tables:
+            key = self._make_version_key(table)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                # not read yet (or evicted), another process may add it first
+                if not self.cache.add(key, time.time_ns(), None):
+                    self.cache.incr(key)
+
+
+_query_caches = {}
+
+
+def get_query_cache(name=None):
+    """
+    Returns the backend of the async queryset ``cache()`` (``REST_ASYNC_QUERY_CACHE`` by default):
+    ``local`` (an in-process LRU of ``REST_ASYNC_QUERY_CACHE_SIZE`` entries) or a ``CACHES`` alias.
+    """
+    name = name or REST_ASYNC_QUERY_CACHE
+    if name not in _query_caches:
+        _query_caches[name] = LocalCache(REST_ASYNC_QUERY_CACHE_SIZE) if name == "local" else DjangoCache(name)
+    return _query_caches[name]
+
+
+_missing = object()
+
+
+def get_query_cache_key(qs, method, args, kwargs, key=None):
+    """
+    Returns the cache key of a terminal call on a queryset: the compiled SQL and params (or the explicit ``key``),
+    the call and the versions of the read tables. None when the result can not be cached.
+    """
+    if qs._prefetch_related_lookups:
+        # the tables of the prefetched relations are not tracked
+        return None
+    # the compiler module uses the LocalCache of this module
+    from django_rest_async.db.compiler import compile_query
+
+    try:
+        compiler, sql, params = compile_query(qs.query, qs.db)
+    except (EmptyResultSet, SynchronousOnlyOperation):
+        # the compilation of some expressions needs the connection, which can not be used in the event loop
+        return None
+    # the joins of select_related() are only known once the query is compiled
+    tables = get_query_tables(compiler.query)
+    if key is None:
+        key = (sql, repr(params))
+    return (qs.db, key, method, repr(args), repr(kwargs), get_table_versions(tables))
+
+
+def get_cached_result(key, default=None):
+    cache = get_query_cache()
+    value = cache.get(key, _missing)
+    if value is _missing:
+        return default
+    # the values of the local cache are shared, the other backends return copies
+    return copy.deepcopy(value) if isinstance(cache, LocalCache) else value
+
+
+def set_cached_result(key, value, ttl=None):
+    cache = get_query_cache()
+    if isinstance(cache, LocalCache):
+        value = copy.deepcopy(value)
+    cache.set(key, value, REST_ASYNC_QUERY_CACHE_TTL if ttl is None else ttl)
+
+
+_table_versions = {}
+_table_versions_lock = threading.Lock()
+# the tables bumped inside bump_again_on_exit()
+_pending_bumps = contextvars.ContextVar("pending_bumps", default=None)
+
+
+def _get_subqueries(expression):
+    # the queries nested in the expressions of a query: __in=queryset, Exists(), Subquery()...
+    if isinstance(expression, Query):
+        yield expression
+        return
+    query = getattr(expression, "query", None)
+    if isinstance(query, Query):
+        yield query
+    children = list(getattr(expression, "children", ()))
+    if hasattr(expression, "get_source_expressions"):
+        children.extend(expression.get_source_expressions())
+    if isinstance(getattr(expression, "rhs", None), Query):
+        children.append(expression.rhs)
+    for child in children:
+        if child is not None and not isinstance(child, (str, bytes)):
+            yield from _get_subqueries(child)
+
+
+def get_query_tables(query):
+    """Returns the tables a query reads: its own, the joined ones and the ones of its subqueries."""
+    tables = {query.model._meta.db_table, *(join.table_name for join in query.alias_map.values())}
+    expressions = [query.where, *query.annotations.values(), *(e for e in query.order_by if not isinstance(e, str))]
+    for expression in expressions:
+        for subquery in _get_subqueries(expression):
+            tables |= get_query_tables(subquery)
+    return tables
+
+
+def get_table_versions(tables):
+    cache = get_query_cache()
+    versions = cache.get_versions(tables) if isinstance(cache, DjangoCache) else _table_versions
+    return tuple((table, versions.get(table, 0)) for table in sorted(tables))
+
+
+def bump_table_versions(*tables):
+    """
+    Makes every cached value computed from the tables unreachable. The versions live in the query cache
+    backend when it is a ``CACHES`` alias, in process memory for the ``local`` one.
+    """
+    cache = get_query_cache()
+    if isinstance(cache, DjangoCache):
+        cache.bump_versions(tables)
+    else:
+        with _table_versions_lock:
+            for table in tables:
+                _table_versions[table] = _table_versions.get(table, 0) + 1
+    pending = _pending_bumps.get()
+    if pending is not None:
+        pending.update(tables)
+
+
+@contextmanager
+def bump_again_on_exit():
+    """
+    Bumps the tables bumped in the block again when it exits. The writes of a pinned connection may run
+    in a transaction: a concurrent read of the old rows cached before the commit is dropped once it is done.
+    """
+    pending = set()
+    token = _pending_bumps.set(pending)
+    try:
+        yield
+    finally:
+        _pending_bumps.reset(token)
+        bump_table_versions(*pending)
+
+
+def forget_pending_bumps():
+    """Stops recording the bumps of the current context, e.g. in a task spawned inside ``bump_again_on_exit``."""
+    _pending_bumps.set(None)
+
+
+def bump_model_versions(*models):
+    bump_table_versions(*(model._meta.db_table for model in models))
+
+
+def bump_deleted_versions(deleted):
+    # QuerySet.delete() / Model.delete() return the deleted counts per model label, cascades included
+    _, counts = deleted
+    bump_model_versions(*(apps.get_model(label) for label in counts))
@@ -0,0 +1,132 @@
+from django_rest_async.db.cache import LocalCache
+from django_rest_async.settings import REST_ASYNC_SQL_CACHE_SIZE
+
+try:
+    from django.core.exceptions import FullResultSet
+except ImportError:  # pragma: no cover
+
+    class FullResultSet(Exception):
+        """Never raised: before django 4.2 a where clause matching every row compiles to an empty string."""
+
+
+# (query shape, where sql) -> (compiler, sql) of the first query compiled with it, False when it can not be reused
+sql_cache = LocalCache(REST_ASYNC_SQL_CACHE_SIZE)
+
+_stats = {"hits": 0, "misses": 0, "uncacheable": 0}
+
+
+def get_sql_cache_stats():
+    """Returns the hits, misses and uncacheable counts of ``compile_query``."""
+    return dict(_stats)
+
+
+def reset_sql_cache():
+    sql_cache.clear()
+    for name in _stats:
+        _stats[name] = 0
+
+
+def _get_join_shape(alias, join, refcount):
+    join_field = getattr(join, "join_field", None)
+    if join_field is not None:
+        join_field = (join_field.__class__, join_field.model, join_field.name)
+    return (
+        alias,
+        join.__class__,
+        join.table_name,
+        getattr(join, "parent_alias", None),
+        getattr(join, "join_type", None),
+        join_field,
+        refcount > 0,
+    )
+
+
+def get_query_shape(query, using):
+    """
+    Returns the key of everything the SQL of the query depends on but its where clause,
+    None when the query uses a feature with parameters outside of the where clause.
+    """
+    if (
+        query.combinator
+        or query.extra
+        or query.extra_tables
+        or query.extra_order_by
+        or query.select_for_update
+        # explain_query before django 4.0
+        or getattr(query, "explain_info", None)
+        or getattr(query, "explain_query", False)
+        or query.group_by is not None
+        or query.where.contains_aggregate
+        or query.where.contains_over_clause
+        or any(getattr(join, "filtered_relation", None) is not None for join in query.alias_map.values())
+    ):
+        return None
+    deferred_names, defer = query.deferred_loading
+    return (
+        using,
+        query.__class__,
+        query.model,
+        query.subquery,
+        tuple(_get_join_shape(alias, join, query.alias_refcount[alias]) for alias, join in query.alias_map.items()),
+        query.default_cols,
+        repr(query.select),
+        query.values_select,
+        # django >= 5.2
+        repr(getattr(query, "selected", None)),
+        repr(query.annotations),
+        repr(query.annotation_select_mask and sorted(query.annotation_select_mask)),
+        repr(query.select_related),
+        query.max_depth,
+        tuple(sorted(deferred_names)),
+        defer,
+        repr(query.order_by),
+        query.default_ordering,
+        query.standard_ordering,
+        query.distinct,
+        query.distinct_fields,
+        query.low_mark,
+        query.high_mark,
+    )
+
+
+def _compile_where(query, using):
+    try:
+        sql, params = query.get_compiler(using).compile(query.where)
+    except FullResultSet:
+        return "", []
+    return sql, list(params)
+
+
+def compile_query(query, using):
+    """
+    Returns (compiler, sql, params) of the query like ``query.get_compiler(using).as_sql()`` does,
+    ``EmptyResultSet`` is raised the same way and the query itself is not compiled.
+
+    The SQL is cached by the shape of the query (its tables, columns, ordering, limits... but not its filter values):
+    a query with a known shape and the same where clause only compiles its where clause to bind the new params.
+    The shapes with params outside of the where clause are always compiled. The SQL of a shape stays the same,
+    so the statement caches of the drivers (prepared statements of asyncpg, sqlite3 statements) are reused.
+    The compiler is the one of the first query of the shape: its columns and converters are the same.
+    """
+    shape = get_query_shape(query, using) if REST_ASYNC_SQL_CACHE_SIZE else None
+    if shape is None:
+        _stats["uncacheable"] += 1
+        compiler = query.chain().get_compiler(using)
+        return (compiler, *compiler.as_sql())
+
+    where_sql, where_params = _compile_where(query, using)
+    key = (shape, where_sql)
+    cached = sql_cache.get(key)
+    if cached:
+        _stats["hits"] += 1
+        compiler, sql = cached
+        return compiler, sql, tuple(where_params)
+
+    _stats["misses" if cached is None else "uncacheable"] += 1
+    compiler = query.chain().get_compiler(using)
+    sql, params = compiler.as_sql()
+    if cached is None:
+        # the where params have to be all the params of the query, in the same order
+        reusable = list(params) == where_params and where_sql in sql
+        sql_cache.set(key, (compiler, sql) if reusable else False)
+    return compiler, sql, params
@@ -0,0 +1,340 @@
+import re
+
+from django.core.exceptions import EmptyResultSet, SynchronousOnlyOperation
+from django.db import connections
+from django.db.models.query import MAX_GET_RESULTS
+
+from django_rest_async.db.compiler import compile_query
+from django_rest_async.db.pagination import (
+    cache_total,
+    capped_total,
+    cursor_page,
+    cursor_paginate,
+    get_capped_queryset,
+    get_count_queryset,
+    get_total_cache_key,
+    get_total_strategy,
+    is_estimate_over_cap,
+    paginate,
+    parse_estimate,
+    total_cache,
+)
+from django_rest_async.db.pool import get_pool
+from django_rest_async.settings import REST_ASYNC_DB_ENGINE
+
+try:
+    import aiosqlite
+except ImportError:  # pragma: no cover
+    aiosqlite = None
+
+try:
+    from django.db.backends.sqlite3._functions import register as register_sqlite_functions
+except ImportError:  # pragma: no cover
+    # django < 4.1 registers them inline in DatabaseWrapper.get_new_connection()
+    register_sqlite_functions = None
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover
+    asyncpg = None
+
+
+FORMAT_QMARK_REGEX = re.compile(r"(?<!%)%s")
+
+
+class NativeEngineUnsupported(Exception):
+    """The queryset can not be executed natively, the caller has to fall back to the sync path."""
+
+
+class SQLiteDriver:
+    vendor = "sqlite"
+
+    def __init__(self, params):
+        self.params = params
+
+    @classmethod
+    def from_connection(cls, connection):
+        return cls(connection.get_connection_params())
+
+    def convert_query(self, sql):
+        return FORMAT_QMARK_REGEX.sub("?", sql).replace("%%", "%")
+
+    async def connect(self):
+        conn = aiosqlite.connect(**self.params)
+        # pooled connections live as long as the process, their worker threads must not block its exit
+        # (aiosqlite < 0.20 connections are the threads themselves)
+        getattr(conn, "_thread", conn).daemon = True
+        conn = await conn
+        if register_sqlite_functions is not None:
+            # the functions django registers on its connections (REGEXP, django_date_extract...), in the driver thread
+            await conn._execute(lambda: register_sqlite_functions(conn._conn))
+        return conn
+
+    async def close(self, conn):
+        await conn.close()
+
+    async def fetch(self, conn, sql, params):
+        async with conn.execute(self.convert_query(sql), params) as cursor:
+            return await cursor.fetchall()
+
+    async def iterate(self, conn, sql, params, chunk_size):
+        async with conn.execute(self.convert_query(sql), params) as cursor:
+            while True:
+                rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+
+class PostgreSQLDriver:
+    vendor = "postgresql"
+
+    def __init__(self, params):
+        self.params = params
+
+    @classmethod
+    def from_connection(cls, connection):
+        settings_dict = connection.settings_dict
+        return cls(
+            {
+                "host": settings_dict["HOST"] or None,
+                "port": int(settings_dict["PORT"]) if settings_dict["PORT"] else None,
+                "user": settings_dict["USER"] or None,
+                "password": settings_dict["PASSWORD"] or None,
+                "database": settings_dict["NAME"],
+            }
+        )
+
+    def convert_query(self, sql):
+        counter = iter(range(1, sql.count("%s") + 1))
+        return FORMAT_QMARK_REGEX.sub(lambda _: f"${next(counter)}", sql).replace("%%", "%")
+
+    async def connect(self):
+        return await asyncpg.connect(**self.params)
+
+    async def close(self, conn):
+        await conn.close()
+
+    async def fetch(self, conn, sql, params):
+        return [tuple(row) for row in await conn.fetch(self.convert_query(sql), *params)]
+
+    async def iterate(self, conn, sql, params, chunk_size):
+        # server side cursors live inside a transaction
+        async with conn.transaction():
+            cursor = await conn.cursor(self.convert_query(sql), *params)
+            while True:
+                rows = await cursor.fetch(chunk_size)
+                if not rows:
+                    break
+                yield [tuple(row) for row in rows]
+
+
+def _get_driver_cls(vendor):
+    if vendor == "sqlite" and aiosqlite is not None:
+        return SQLiteDriver
+    if vendor == "postgresql" and asyncpg is not None:
+        return PostgreSQLDriver
+    return None
+
+
+class NativeEngine:
+    """
+    Executes read querysets on an asyncio database driver.
+
+    The SQL is compiled with the django SQL compiler and the rows are hydrated the same way
+    the django iterables do it, so the results are interchangeable with the sync path.
+    Anything the engine does not know how to run raises ``NativeEngineUnsupported``.
+    """
+
+    def __init__(self, using, driver):
+        self.using = using
+        self.driver = driver
+
+    async def execute(self, sql, params):
+        async with get_pool(self.using, self.driver).connection() as conn:
+            return await self.driver.fetch(conn, sql, params)
+
+    async def iterate(self, statement, chunk_size):
+        sql, params, hydrate = statement
+        if sql is None:
+            return
+        async with get_pool(self.using, self.driver).connection() as conn:
+            async for rows in self.driver.iterate(conn, sql, params, chunk_size):
+                yield hydrate(rows)
+
+    async def run(self, statement):
+        sql, params, hydrate = statement
+        if sql is None:
+            return []
+        return hydrate(await self.execute(sql, params))
+
+    def compile(self, qs):
+        try:
+            return compile_query(qs.query, self.using)
+        except SynchronousOnlyOperation:
+            # the backend needs a sync connection to compile (e.g. server version checks)
+            raise NativeEngineUnsupported()
+
+    def _prepare(self, qs, make_item):
+        """Returns the (sql, params, hydrate) statement of the queryset, sql is None for an empty result."""
+        try:
+            compiler, sql, params = self.compile(qs)
+        except EmptyResultSet:
+            return None, None, None
+        converters = compiler.get_converters([f[0] for f in compiler.select])
+        make_item = make_item(compiler)
+
+        def hydrate(rows):
+            if converters:
+                rows = compiler.apply_converters(rows, converters)
+            return [make_item(row) for row in rows]
+
+        return sql, params, hydrate
+
+    def prepare_query(self, qs):
+        if qs._prefetch_related_lookups or qs._known_related_objects:
+            raise NativeEngineUnsupported()
+
+        def make_model(compiler):
+            klass_info = compiler.klass_info
+            if klass_info is None or klass_info.get("related_klass_infos"):
+                raise NativeEngineUnsupported()
+            model_cls = klass_info["model"]
+            select_fields = klass_info["select_fields"]
+            start, end = select_fields[0], select_fields[-1] + 1
+            init_list = [f[0].target.attname for f in compiler.select[start:end]]
+            annotation_col_map = compiler.annotation_col_map
+
+            def make_item(row):
+                obj = model_cls.from_db(self.using, init_list, row[start:end])
+                for attr_name, col_pos in annotation_col_map.items():
+                    setattr(obj, attr_name, row[col_pos])
+                return obj
+
+            return make_item
+
+        return self._prepare(qs, make_model)
+
+    def _values_names(self, qs):
+        query = qs.query
+        if getattr(query, "selected", None):
+            return list(query.selected)
+        return [*query.extra_select, *query.values_select, *query.annotation_select]
+
+    def prepare_values(self, qs, *fields, **expressions):
+        qs = qs.values(*fields, **expressions)
+        names = self._values_names(qs)
+        return self._prepare(qs, lambda compiler: lambda row: dict(zip(names, row)))
+
+    def prepare_values_list(self, qs, *fields, flat=False, named=False):
+        qs = qs.values_list(*fields, flat=flat, named=named)
+        names = self._values_names(qs)
+        if named or (qs._fields and list(qs._fields) != names):
+            raise NativeEngineUnsupported()
+        if flat:
+            return self._prepare(qs, lambda compiler: lambda row: row[0])
+        return self._prepare(qs, lambda compiler: tuple)
+
+    async def query(self, qs):
+        return await self.run(self.prepare_query(qs))
+
+    async def get(self, qs, *args, **kwargs):
+        clone = qs.filter(*args, **kwargs) if args or kwargs else qs._chain()
+        if clone.query.can_filter() and not clone.query.distinct_fields:
+            clone = clone.order_by()
+        clone.query.set_limits(high=MAX_GET_RESULTS)
+        objs = await self.query(clone)
+        if len(objs) == 1:
+            return objs[0]
+        if not objs:
+            raise qs.model.DoesNotExist(f"{qs.model._meta.object_name} matching query does not exist.")
+        raise qs.model.MultipleObjectsReturned(f"get() returned more than one {qs.model._meta.object_name}")
+
+    async def first(self, qs):
+        qs = qs if qs.ordered else qs.order_by("pk")
+        objs = await self.query(qs[:1])
+        return objs[0] if objs else None
+
+    async def last(self, qs):
+        qs = qs.reverse() if qs.ordered else qs.order_by("-pk")
+        objs = await self.query(qs[:1])
+        return objs[0] if objs else None
+
+    def _inner_pk_sql(self, qs):
+        _, sql, params = self.compile(get_count_queryset(qs))
+        return sql, params
+
+    async def count(self, qs):
+        try:
+            sql, params = self._inner_pk_sql(qs)
+        except EmptyResultSet:
+            return 0
+        rows = await self.execute(f"SELECT COUNT(*) FROM ({sql}) subquery", params)
+        return rows[0][0]
+
+    async def exists(self, qs):
+        try:
+            sql, params = self._inner_pk_sql(qs)
+        except EmptyResultSet:
+            return False
+        rows = await self.execute(f"SELECT 1 FROM ({sql}) subquery LIMIT 1", params)
+        return bool(rows)
+
+    async def values(self, qs, *fields, **expressions):
+        return await self.run(self.prepare_values(qs, *fields, **expressions))
+
+    async def values_list(self, qs, *fields, flat=False, named=False):
+        return await self.run(self.prepare_values_list(qs, *fields, flat=flat, named=named))
+
+    async def get_total(self, qs, total=None):
+        strategy = get_total_strategy(total)
+        if strategy == "none":
+            return None, False
+        if strategy == "exact":
+            return await self.count(qs), True
+        try:
+            sql, params = self._inner_pk_sql(qs)
+        except EmptyResultSet:
+            return 0, True
+        if strategy == "cached":
+            key = get_total_cache_key(qs, sql, params)
+            count = total_cache.get(key)
+            if count is None:
+                count = await self.count(qs)
+                cache_total(key, count)
+            return count, True
+        if self.driver.vendor == "postgresql":
+            rows = await self.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            estimate = parse_estimate(rows[0][0])
+            if is_estimate_over_cap(estimate):
+                return estimate, False
+        return capped_total(await self.count(get_capped_queryset(qs)))
+
+    async def pagination_query(self, qs, order_by=None, limit=None, offset=0, total=None):
+        total, total_exact = await self.get_total(qs, total)
+        return {
+            "results": await self.query(paginate(qs, order_by, limit, offset)),
+            "total": total,
+            "total_exact": total_exact,
+            "order_by": order_by,
+            "limit": limit,
+            "offset": offset,
+        }
+
+    async def cursor_pagination_query(self, qs, order_by=None, limit=None, cursor=None):
+        qs, ordering, direction = cursor_paginate(qs, order_by, limit, cursor)
+        return cursor_page(await self.query(qs), ordering, direction, order_by, limit)
+
+
+_engines = {}
+
+
+def get_engine(using):
+    """Returns the native engine for the database alias or None when the sync path has to be used."""
+    if REST_ASYNC_DB_ENGINE != "native":
+        return None
+    if using not in _engines:
+        connection = connections[using]
+        driver_cls = _get_driver_cls(connection.vendor)
+        _engines[using] = NativeEngine(using, driver_cls.from_connection(connection)) if driver_cls else None
+    return _engines[using]
@@ -0,0 +1,291 @@
+import asyncio
+import contextvars
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.db import close_old_connections, connections
+
+from django_rest_async.db.cache import bump_again_on_exit, forget_pending_bumps
+from django_rest_async.settings import REST_ASYNC_DB_EXECUTOR, REST_ASYNC_DEDICATED_THREADS
+
+_executors = {}
+# alias -> [(single thread executor, future of the reset of its connection)]
+_idle_dedicated_executors = {}
+# event loop -> {alias: semaphore bounding the dedicated threads of the alias}
+_dedicated_slots = weakref.WeakKeyDictionary()
+_pinned_executors = contextvars.ContextVar("pinned_executors", default={})
+_queued_calls = contextvars.ContextVar("queued_calls", default={})
+
+
+def _get_executor_size(using):
+    if isinstance(REST_ASYNC_DB_EXECUTOR, dict):
+        return REST_ASYNC_DB_EXECUTOR.get(using)
+    return REST_ASYNC_DB_EXECUTOR
+
+
+def get_executor(using):
+    """
+    Returns the thread pool of the database alias configured with ``REST_ASYNC_DB_EXECUTOR``
+    (a number of threads for every alias or a dict of alias -> number of threads)
+    or None when the calls go through the single thread sensitive thread.
+    """
+    size = _get_executor_size(using)
+    if not size:
+        return None
+    if using not in _executors:
+        _executors[using] = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"django-rest-async-{using}")
+    return _executors[using]
+
+
+def shutdown_executors(wait=True):
+    while _executors:
+        _, executor = _executors.popitem()
+        executor.shutdown(wait=wait)
+    while _idle_dedicated_executors:
+        _, idle = _idle_dedicated_executors.popitem()
+        for executor, _ in idle:
+            executor.submit(connections.close_all)
+            executor.shutdown(wait=wait)
+
+
+def is_pinned(using):
+    return using in _pinned_executors.get()
+
+
+def unpin_connections():
+    """Stops the current context (e.g. a task spawned inside ``pin_connection``) from using the pinned threads."""
+    _pinned_executors.set({})
+    _queued_calls.set({})
+    forget_pending_bumps()
+
+
+class QueuedCall:
+    """
+    A db call queued on a pinned connection. It runs with the next call made on the pinned thread,
+    awaiting it runs the queue if it did not run yet and returns its result.
+    """
+
+    def __init__(self, using, fn, args, kwargs):
+        self.using = using
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.done = False
+        self.result = None
+        self.error = None
+
+    def resolve(self, outcome):
+        self.done = True
+        self.result, self.error = outcome
+
+    def __await__(self):
+        return self._get().__await__()
+
+    async def _get(self):
+        if not self.done:
+            await flush_db_calls(self.using)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def queue_db_call(using, fn, /, *args, **kwargs):
+    """Queues the sync ``fn`` on the pinned connection of the database alias, see ``pin_connection``."""
+    if not is_pinned(using):
+        raise RuntimeError(f"The {using} connection is not pinned, db calls can only be queued in pin_connection")
+    call = QueuedCall(using, fn, args, kwargs)
+    _queued_calls.get()[using].append(call)
+    return call
+
+
+def take_db_calls(using):
+    queue = _queued_calls.get().get(using)
+    if not queue:
+        return []
+    calls = list(queue)
+    queue.clear()
+    return calls
+
+
+def run_db_calls(calls):
+    """Runs queued calls in order (on the pinned thread), stops at the first error. Returns the outcomes."""
+    outcomes = []
+    for call in calls:
+        try:
+            outcomes.append((call.fn(*call.args, **call.kwargs), None))
+        except Exception as e:
+            outcomes.append((None, e))
+            break
+    return outcomes
+
+
+def resolve_db_calls(calls, outcomes):
+    error = None
+    for call, outcome in zip(calls, outcomes):
+        call.resolve(outcome)
+        error = outcome[1]
+    for call in islice(calls, len(outcomes), None):
+        # not run because a previous call failed
+        call.resolve((None, error))
+    return error
+
+
+def _run_after_calls(calls, fn, args, kwargs):
+    outcomes = run_db_calls(calls)
+    if outcomes and outcomes[-1][1] is not None:
+        return outcomes, None
+    return outcomes, fn(*args, **kwargs)
+
+
+async def flush_db_calls(using):
+    """Runs the calls queued on the pinned connection of the database alias."""
+    if _queued_calls.get().get(using):
+        await run_in_db_executor(using, lambda: None)
+
+
+def _run_task(fn, *args, **kwargs):
+    # every executor thread owns its connection, it is recycled the same way django does it per request
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_executor(using, fn, /, *args, **kwargs):
+    """Runs the sync ``fn`` on the thread owning the connection of the database alias."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    pinned_executor = _pinned_executors.get().get(using)
+    if pinned_executor is not None:
+        calls = take_db_calls(using)
+        if not calls:
+            return await loop.run_in_executor(pinned_executor, lambda: context.run(fn, *args, **kwargs))
+        # the queued calls run first, in the same thread hop
+        outcomes, result = await loop.run_in_executor(
+            pinned_executor, lambda: context.run(_run_after_calls, calls, fn, args, kwargs)
+        )
+        error = resolve_db_calls(calls, outcomes)
+        if error is not None:
+            raise error
+        return result
+    executor = get_executor(using)
+    if executor is None:
+        return await sync_to_async(fn, thread_sensitive=True)(*args, **kwargs)
+    return await loop.run_in_executor(executor, lambda: context.run(_run_task, fn, *args, **kwargs))
+
+
+def _reset_dedicated_connection(using):
+    connection = connections[using]
+    if connection.in_atomic_block:
+        # a transaction left open in the block must not leak into the next one: the thread is not reused
+        connections.close_all()
+        return False
+    # like at the end of a request: the connection is kept for CONN_MAX_AGE seconds
+    connection.close_if_unusable_or_obsolete()
+    return True
+
+
+def _get_dedicated_slots(using):
+    slots = _dedicated_slots.setdefault(asyncio.get_running_loop(), {})
+    if using not in slots:
+        slots[using] = asyncio.Semaphore(REST_ASYNC_DEDICATED_THREADS)
+    return slots[using]
+
+
+async def _borrow_executor(using):
+    idle = _idle_dedicated_executors.get(using, [])
+    while idle:
+        executor, reset = idle.pop()
+        try:
+            reusable = await asyncio.wrap_future(reset)
+        except Exception:
+            reusable = False
+        except BaseException:
+            # cancelled while the reset runs: the thread stays available to the others
+            idle.append((executor, reset))
+            raise
+        if reusable:
+            return executor
+        executor.shutdown(wait=False)
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"django-rest-async-{using}-pinned")
+
+
+def _release_executor(using, executor):
+    # the reset runs on the thread before the calls of the next borrower, nobody waits for it
+    reset = executor.submit(_reset_dedicated_connection, using)
+    idle = _idle_dedicated_executors.setdefault(using, [])
+    if len(idle) < REST_ASYNC_DEDICATED_THREADS:
+        idle.append((executor, reset))
+    else:
+        executor.submit(connections.close_all)
+        executor.shutdown(wait=False)
+
+
+@asynccontextmanager
+async def _dedicated_executor(using):
+    """
+    Borrows a single thread executor of the database alias, its thread and connection are reused by the next
+    blocks. There are at most ``REST_ASYNC_DEDICATED_THREADS`` threads (and connections) per alias,
+    the blocks beyond wait for one to be released.
+    """
+    slots = _get_dedicated_slots(using)
+    await slots.acquire()
+    try:
+        executor = await _borrow_executor(using)
+    except BaseException:
+        slots.release()
+        raise
+    try:
+        yield executor
+    finally:
+        _release_executor(using, executor)
+        slots.release()
+
+
+@asynccontextmanager
+async def pin_connection(using):
+    """
+    Runs every db call of the database alias made inside the block on one dedicated thread,
+    so a transaction opened in the block keeps using the same connection.
+    At most ``REST_ASYNC_DEDICATED_THREADS`` blocks per alias run at once, the others wait.
+    The cache versions of the tables written in the block are bumped again when it exits, after the commit.
+    """
+    if is_pinned(using):
+        yield
+        return
+    async with _dedicated_executor(using) as executor:
+        token = _pinned_executors.set({**_pinned_executors.get(), using: executor})
+        queued_token = _queued_calls.set({**_queued_calls.get(), using: []})
+        try:
+            with bump_again_on_exit():
+                yield
+                await flush_db_calls(using)
+        finally:
+            _queued_calls.reset(queued_token)
+            _pinned_executors.reset(token)
+
+
+@asynccontextmanager
+async def dedicated_connection(using):
+    """
+    Yields a ``run(fn, *args, **kwargs)`` coroutine function executing sync calls on one thread,
+    e.g. to keep a server side cursor on its connection between chunks.
+    Inside a pinned block the pinned thread is used.
+    """
+    if is_pinned(using):
+        yield partial(run_in_db_executor, using)
+        return
+    async with _dedicated_executor(using) as executor:
+        loop = asyncio.get_running_loop()
+
+        async def run(fn, *args, **kwargs):
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(executor, lambda: context.run(fn, *args, **kwargs))
+
+        yield run
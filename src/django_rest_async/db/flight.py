@@ -0,0 +1,29 @@
+import asyncio
+import weakref
+
+# event loop -> {key: task} of the calls in flight
+_flights = weakref.WeakKeyDictionary()
+
+
+def _forget(flights, key, task):
+    if flights.get(key) is task:
+        del flights[key]
+    if not task.cancelled():
+        # the error is raised to the callers, none of them may be left to retrieve it
+        task.exception()
+
+
+async def single_flight(key, fn):
+    """
+    Runs the coroutine function ``fn`` once for the concurrent callers with the same ``key``:
+    the callers arriving while it runs await the same result (or error).
+    Returns (result, whether this caller ran it). A cancelled caller does not cancel the others.
+    """
+    flights = _flights.setdefault(asyncio.get_running_loop(), {})
+    task = flights.get(key)
+    if task is not None:
+        return await asyncio.shield(task), False
+    task = asyncio.ensure_future(fn())
+    flights[key] = task
+    task.add_done_callback(lambda task: _forget(flights, key, task))
+    return await asyncio.shield(task), True
@@ -1,12 +1,24 @@
-from asgiref.sync import sync_to_async
+from functools import lru_cache
 
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import router
 
+from django_rest_async.db.executor import run_in_db_executor
 from django_rest_async.db.models import AsyncModel
 
 
-@sync_to_async(thread_sensitive=True)
-def get_value_from_db_instance(instance: AsyncModel, field_name: str, many: bool = False):
+async def get_value_from_db_instance(instance: AsyncModel, field_name: str, many: bool = False):
+    from django_rest_async.db.loader import get_relation_loader
+
+    loader = get_relation_loader()
+    if loader is not None:
+        # batched with the other loads of the request
+        return await loader.load(instance, field_name, many=many)
+    using = instance._state.db or router.db_for_read(instance.__class__, instance=instance)
+    return await run_in_db_executor(using, get_value_from_db_instance_sync, instance, field_name, many)
+
+
+def get_value_from_db_instance_sync(instance: AsyncModel, field_name: str, many: bool = False):
     try:
         value = getattr(instance, field_name)
     except AttributeError:
@@ -16,3 +28,31 @@ def get_value_from_db_instance(instance: AsyncModel, field_name: str, many: bool
     if many:
         return [i for i in value.all()]
     return value
+
+
+def is_relation_loaded(instance, field) -> bool:
+    """Whether the relation was already fetched (select_related, prefetch_related or a previous access)."""
+    if field.many_to_many or field.one_to_many:
+        if field.one_to_many:
+            # django < 5.1 has no cache_name on the reverse relations
+            cache_name = field.cache_name if hasattr(field, "cache_name") else field.get_cache_name()
+        elif field.concrete:
+            cache_name = field.name
+        else:
+            cache_name = field.field.related_query_name()
+        return cache_name in getattr(instance, "_prefetched_objects_cache", {})
+    return field.is_cached(instance)
+
+
+@lru_cache(maxsize=None)
+def get_model_fields(model) -> dict:
+    """Returns the model fields by name, attname and, for reverse relations, accessor name (e.g. `comment_set`)."""
+    fields = {}
+    for field in model._meta.get_fields():
+        if field.auto_created and not field.concrete and field.is_relation:
+            fields[field.get_accessor_name()] = field
+        else:
+            fields[field.name] = field
+        if field.concrete and field.is_relation:
+            fields[field.attname] = field
+    return fields
@@ -0,0 +1,114 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import router
+from django.db.models import prefetch_related_objects
+
+from django_rest_async.db.executor import run_in_db_executor
+from django_rest_async.db.helpers import get_model_fields, get_value_from_db_instance_sync, is_relation_loaded
+
+_current_loader = ContextVar("relation_loader", default=None)
+
+
+def _load_values(instances, model, field_name, many):
+    field = get_model_fields(model).get(field_name)
+    if field is not None and field.is_relation:
+        missing = [instance for instance in instances if not is_relation_loaded(instance, field)]
+        if missing:
+            # one pk__in query for the whole batch
+            prefetch_related_objects(missing, field_name)
+    return [get_value_from_db_instance_sync(instance, field_name, many) for instance in instances]
+
+
+def _run_batches(batches):
+    return [fn([item for item, _ in batch.values()], *args) for fn, args, batch in batches]
+
+
+class RelationLoader:
+    """
+    Batches the reads issued in the same event loop tick across all rows and coroutines, one thread hop
+    per database: the loads of a (model, field) are resolved with one ``prefetch_related_objects`` query
+    and the reads of the same serializer plan are merged. The loaded values are cached for the lifetime
+    of the loader.
+    """
+
+    def __init__(self):
+        # (using, fn, key of the args) -> (args, {key: (item, future)})
+        self._pending = {}
+        self._cache = {}
+        self._dispatch_scheduled = False
+
+    def _enqueue(self, using, fn, args, args_key, key, item):
+        loop = asyncio.get_running_loop()
+        _, batch = self._pending.setdefault((using, fn, args_key), (args, {}))
+        if key not in batch:
+            batch[key] = (item, loop.create_future())
+        if not self._dispatch_scheduled:
+            self._dispatch_scheduled = True
+            loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+        return batch[key][1]
+
+    async def load(self, instance, field_name, many=False):
+        model = instance.__class__
+        field = get_model_fields(model).get(field_name)
+        if field is not None and field.is_relation and is_relation_loaded(instance, field):
+            # nothing to fetch, reading the cached value does not touch the database
+            return get_value_from_db_instance_sync(instance, field_name, many)
+        key = (model, instance.pk if instance.pk is not None else id(instance), field_name, many)
+        if key not in self._cache:
+            using = instance._state.db or router.db_for_read(model, instance=instance)
+            args = (model, field_name, many)
+            self._cache[key] = self._enqueue(using, _load_values, args, args, key, instance)
+        future = self._cache[key]
+        try:
+            return await future
+        except Exception:
+            # an error is not cached, the next load tries again
+            if self._cache.get(key) is future:
+                del self._cache[key]
+            raise
+
+    async def read(self, using, fn, arg, items):
+        """
+        Returns ``fn(items, arg)`` (a sync function returning a result per item) run with the items
+        of the other reads of ``fn`` and the same ``arg`` made in this tick.
+        """
+        futures = [self._enqueue(using, fn, (arg,), id(arg), id(item), item) for item in items]
+        return list(await asyncio.gather(*futures))
+
+    async def _dispatch(self):
+        self._dispatch_scheduled = False
+        pending, self._pending = self._pending, {}
+        by_using = {}
+        for (using, fn, _), (args, batch) in pending.items():
+            by_using.setdefault(using, []).append((fn, args, batch))
+        await asyncio.gather(*[self._run(using, batches) for using, batches in by_using.items()])
+
+    async def _run(self, using, batches):
+        try:
+            results = await run_in_db_executor(using, _run_batches, batches)
+        except Exception as e:
+            for _, _, batch in batches:
+                for _, future in batch.values():
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for (_, _, batch), values in zip(batches, results):
+            for (_, future), value in zip(batch.values(), values):
+                if not future.done():
+                    future.set_result(value)
+
+
+def get_relation_loader():
+    return _current_loader.get()
+
+
+@contextmanager
+def use_relation_loader():
+    """Activates a relation loader for the coroutines (and the tasks they create) running in the block."""
+    token = _current_loader.set(RelationLoader())
+    try:
+        yield _current_loader.get()
+    finally:
+        _current_loader.reset(token)
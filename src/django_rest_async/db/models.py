@@ -1,8 +1,10 @@
-from asgiref.sync import sync_to_async
-
+from django.db import router
 from django.db.models import Model, QuerySet
+from django.db.models.signals import class_prepared, post_save
 
-from django_rest_async.db.queryset import AsyncManyRelatedQuerySet, AsyncQuerySet
+from django_rest_async.db.cache import bump_deleted_versions, bump_model_versions
+from django_rest_async.db.executor import run_in_db_executor
+from django_rest_async.db.queryset import AsyncManyRelatedQuerySet, AsyncQuerySet, AsyncReverseRelatedQuerySet
 from django_rest_async.db.signals import async_post_delete, async_post_save, async_pre_delete, async_pre_save
 
 
@@ -11,17 +13,22 @@ class AsyncModel(Model):
     objects = QuerySet.as_manager()
     async_objects = AsyncQuerySet.as_manager()
 
-    @sync_to_async(thread_sensitive=True)
-    def _save(self, *args, **kwargs):
-        return self.save(*args, **kwargs)
+    def _db_for_write(self, using=None):
+        return using or router.db_for_write(self.__class__, instance=self)
+
+    async def _save(self, *args, **kwargs):
+        result = await run_in_db_executor(self._db_for_write(kwargs.get("using")), self.save, *args, **kwargs)
+        bump_model_versions(self.__class__)
+        return result
 
-    @sync_to_async(thread_sensitive=True)
-    def _delete(self, *args, **kwargs):
-        return self.delete(*args, **kwargs)
+    async def _delete(self, *args, **kwargs):
+        result = await run_in_db_executor(self._db_for_write(kwargs.get("using")), self.delete, *args, **kwargs)
+        bump_deleted_versions(result)
+        return result
 
-    @sync_to_async(thread_sensitive=True)
-    def _refresh_from_db(self, *args, **kwargs):
-        return self.refresh_from_db(*args, **kwargs)
+    async def _refresh_from_db(self, *args, **kwargs):
+        using = kwargs.get("using") or self._state.db or router.db_for_read(self.__class__, instance=self)
+        return await run_in_db_executor(using, self.refresh_from_db, *args, **kwargs)
 
     async def async_save(self, *args, **kwargs):
         cls = origin = self.__class__
@@ -41,7 +48,7 @@ class AsyncModel(Model):
             await async_post_save.async_send(
                 sender=origin,
                 instance=self,
-                created=None,  # TODO
+                created=self.__dict__.pop("_async_created", None),
                 update_fields=update_fields,
                 raw=False,
                 using=using,
@@ -67,19 +74,90 @@ class AsyncModel(Model):
     async def async_refresh_from_db(self, *args, **kwargs):
         return await self._refresh_from_db(*args, **kwargs)
 
-    def __getattribute__(self, field):
-        if not field.startswith("async_"):
-            return super().__getattribute__(field)
-        field_name = field.replace("async_", "")
-        opts = self._meta
-        m2m_fields = [f.name for f in opts.many_to_many]
-        rel_fields = [f.name for f in opts.get_fields() if f.__class__.__name__ in ("ForeignKey", "OneToOneField")]
-        if field_name in m2m_fields:
-            value = super().__getattribute__(field_name)
-            return AsyncManyRelatedQuerySet(value)
-        if field_name in rel_fields:
-            return sync_to_async(super().__getattribute__, thread_sensitive=True)(field_name)
-        return super().__getattribute__(field)
+    def __getattr__(self, name):
+        # reverse relations are only known once all the models are loaded:
+        # their `async_<accessor>` descriptor is installed on the first access
+        if name.startswith("async_") and _prepare_async_reverse_relation(self.__class__, name.replace("async_", "", 1)):
+            return getattr(self, name)
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
 
     class Meta:
         abstract = True
+
+
+async def _cached(value):
+    return value
+
+
+class AsyncRelatedObjectDescriptor:
+    """
+    ``instance.async_<fk>`` (or a reverse o2o): an awaitable of the related object.
+    It is fetched in the db executor once, then read from the instance fields cache.
+    """
+
+    def __init__(self, field, field_name):
+        self.field = field
+        self.field_name = field_name
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        if self.field.is_cached(instance):
+            return _cached(self.field.get_cached_value(instance))
+        using = instance._state.db or router.db_for_read(instance.__class__, instance=instance)
+        return run_in_db_executor(using, getattr, instance, self.field_name)
+
+
+class AsyncManyRelatedDescriptor:
+    """
+    ``instance.async_<m2m>`` (or a reverse fk or m2m): the async queryset of the related manager.
+    Prefetched rows are returned without reading the database.
+    """
+
+    def __init__(self, field_name):
+        self.field_name = field_name
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        sync_manager = getattr(instance, self.field_name)
+        if hasattr(sync_manager, "through"):
+            return AsyncManyRelatedQuerySet(sync_manager)
+        return AsyncReverseRelatedQuerySet(sync_manager)
+
+
+def _record_created(sender, instance, created, **kwargs):
+    # save() only knows if it inserted or updated, async_save reads it back for async_post_save
+    instance._async_created = created
+
+
+def _prepare_async_model(sender, **kwargs):
+    # the `async_<field>` descriptors are installed once per model class, the class is the dispatch table
+    if not issubclass(sender, AsyncModel):
+        return
+    post_save.connect(_record_created, sender=sender, weak=False)
+    opts = sender._meta
+    descriptors = {}
+    for field in opts.fields:
+        if field.concrete and (field.many_to_one or field.one_to_one):
+            descriptors[field.name] = AsyncRelatedObjectDescriptor(field, field.name)
+    for field in opts.many_to_many:
+        descriptors[field.name] = AsyncManyRelatedDescriptor(field.name)
+    for field_name, descriptor in descriptors.items():
+        if f"async_{field_name}" not in sender.__dict__:
+            setattr(sender, f"async_{field_name}", descriptor)
+
+
+def _prepare_async_reverse_relation(model, accessor_name) -> bool:
+    for rel in model._meta.related_objects:
+        if rel.get_accessor_name() != accessor_name:
+            continue
+        if rel.one_to_one:
+            setattr(model, f"async_{accessor_name}", AsyncRelatedObjectDescriptor(rel, accessor_name))
+        else:
+            setattr(model, f"async_{accessor_name}", AsyncManyRelatedDescriptor(accessor_name))
+        return True
+    return False
+
+
+class_prepared.connect(_prepare_async_model)
@@ -0,0 +1,207 @@
+import json
+
+from django.core import signing
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+from django_rest_async.db.cache import LocalCache, get_query_tables, get_table_versions
+from django_rest_async.settings import (
+    REST_ASYNC_PAGINATION_COUNT_CAP,
+    REST_ASYNC_PAGINATION_TOTAL,
+    REST_ASYNC_PAGINATION_TOTAL_CACHE_TTL,
+)
+
+CURSOR_SALT = "django_rest_async.cursor"
+TOTAL_STRATEGIES = ("exact", "cached", "estimated", "none")
+
+total_cache = LocalCache()
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def paginate(qs, order_by=None, limit=None, offset=0):
+    if order_by:
+        qs = qs.order_by(*order_by)
+    if limit:
+        qs = qs[offset : offset + limit]  # noqa
+    return qs
+
+
+def get_total_strategy(total=None):
+    total = total or REST_ASYNC_PAGINATION_TOTAL
+    if total not in TOTAL_STRATEGIES:
+        raise ValueError(f"Unsupported pagination total {total}, use one of {', '.join(TOTAL_STRATEGIES)}")
+    return total
+
+
+def get_count_queryset(qs):
+    inner = qs if qs.query.is_sliced else qs.order_by()
+    return inner.values("pk")
+
+
+def get_total_cache_key(qs, sql, params):
+    # table versions are bumped on writes, so stale totals are never read again
+    return (qs.db, sql, repr(params), get_table_versions(get_query_tables(qs.query)))
+
+
+def parse_estimate(plan):
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def is_estimate_over_cap(estimate):
+    return estimate > REST_ASYNC_PAGINATION_COUNT_CAP
+
+
+def get_capped_queryset(qs):
+    return qs[: REST_ASYNC_PAGINATION_COUNT_CAP + 1]
+
+
+def capped_total(count):
+    """Total of a ``COUNT`` over ``LIMIT cap + 1``, it is exact only below the cap."""
+    if count > REST_ASYNC_PAGINATION_COUNT_CAP:
+        return REST_ASYNC_PAGINATION_COUNT_CAP, False
+    return count, True
+
+
+def cache_total(key, count):
+    total_cache.set(key, count, REST_ASYNC_PAGINATION_TOTAL_CACHE_TTL)
+
+
+def get_total(qs, total=None):
+    """
+    Returns (total, is the total exact) with the ``total`` strategy:
+    ``exact`` runs a ``COUNT``, ``cached`` caches it by the count SQL and params for
+    ``REST_ASYNC_PAGINATION_TOTAL_CACHE_TTL`` seconds, ``estimated`` reads the planner statistics
+    on postgresql (or runs a count capped with ``REST_ASYNC_PAGINATION_COUNT_CAP``) and ``none`` skips it.
+    """
+    strategy = get_total_strategy(total)
+    if strategy == "none":
+        return None, False
+    if strategy == "exact":
+        return qs.count(), True
+    try:
+        sql, params = get_count_queryset(qs).query.get_compiler(qs.db).as_sql()
+    except EmptyResultSet:
+        return 0, True
+    if strategy == "cached":
+        key = get_total_cache_key(qs, sql, params)
+        count = total_cache.get(key)
+        if count is None:
+            count = qs.count()
+            cache_total(key, count)
+        return count, True
+    connection = connections[qs.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            estimate = parse_estimate(cursor.fetchone()[0])
+        if is_estimate_over_cap(estimate):
+            return estimate, False
+    return capped_total(get_capped_queryset(qs).count())
+
+
+def get_cursor_ordering(model, order_by):
+    """
+    Returns the (field, descending) ordering with the pk as the last tiebreaker.
+    The fields must be local and not nullable: a NULL can not be compared in the keyset filter.
+    """
+    ordering = []
+    for field_name in order_by or []:
+        descending = field_name.startswith("-")
+        field_name = field_name.lstrip("-")
+        field = model._meta.pk if field_name == "pk" else model._meta.get_field(field_name)
+        if not field.concrete or field.many_to_many or field.one_to_many:
+            raise InvalidCursorError(f"Cursor pagination supports only local fields, got {field_name}")
+        if field.null:
+            raise InvalidCursorError(f"Cursor pagination does not support nullable fields, got {field_name}")
+        ordering.append((field, descending))
+    if not any(field == model._meta.pk for field, _ in ordering):
+        ordering.append((model._meta.pk, False))
+    return ordering
+
+
+def _get_ordering_key(ordering):
+    return ",".join(("-" if descending else "") + field.attname for field, descending in ordering)
+
+
+def encode_cursor(obj, ordering, direction):
+    # the values are serialized without loss (e.g. the microseconds of a datetime) to be compared exactly
+    return signing.dumps(
+        {
+            "v": [field.value_to_string(obj) for field, _ in ordering],
+            "d": direction,
+            "o": _get_ordering_key(ordering),
+        },
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def decode_cursor(cursor, ordering):
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise InvalidCursorError("Invalid cursor")
+    if data.get("d") not in ("next", "prev") or len(data.get("v") or []) != len(ordering):
+        raise InvalidCursorError("Invalid cursor")
+    if data.get("o") != _get_ordering_key(ordering):
+        # the values of a cursor are compared to the fields of its own ordering only
+        raise InvalidCursorError("The cursor does not match the ordering")
+    try:
+        values = [field.to_python(value) for (field, _), value in zip(ordering, data["v"])]
+    except ValidationError:
+        raise InvalidCursorError("Invalid cursor")
+    return values, data["d"]
+
+
+def _keyset_filter(ordering, values, forward):
+    # (a, b) > (x, y) is expanded to a > x OR (a = x AND b > y) to support mixed directions
+    keyset = Q()
+    for i, (field, descending) in enumerate(ordering):
+        lookup = "lt" if descending == forward else "gt"
+        condition = Q(**{f"{field.attname}__{lookup}": values[i]})
+        for j in range(i):
+            condition &= Q(**{ordering[j][0].attname: values[j]})
+        keyset |= condition
+    return keyset
+
+
+def cursor_paginate(qs, order_by=None, limit=None, cursor=None):
+    """
+    Returns the queryset of the page (fetching one extra row to detect the next page),
+    the ordering and the cursor direction.
+    """
+    ordering = get_cursor_ordering(qs.model, order_by)
+    direction = None
+    forward = True
+    if cursor:
+        values, direction = decode_cursor(cursor, ordering)
+        forward = direction == "next"
+        qs = qs.filter(_keyset_filter(ordering, values, forward))
+    qs = qs.order_by(*[("-" if descending == forward else "") + field.attname for field, descending in ordering])
+    if limit:
+        qs = qs[: limit + 1]
+    return qs, ordering, direction
+
+
+def cursor_page(rows, ordering, direction, order_by=None, limit=None):
+    rows = list(rows)
+    has_more = bool(limit) and len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+    if direction == "prev":
+        rows.reverse()
+    has_next = has_more if direction != "prev" else True
+    has_prev = has_more if direction == "prev" else direction == "next"
+    return {
+        "results": rows,
+        "next_cursor": encode_cursor(rows[-1], ordering, "next") if rows and has_next else None,
+        "prev_cursor": encode_cursor(rows[0], ordering, "prev") if rows and has_prev else None,
+        "order_by": order_by,
+        "limit": limit,
+    }
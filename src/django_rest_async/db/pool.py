@@ -0,0 +1,194 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from django.db import connections
+
+
+class PoolTimeoutError(TimeoutError):
+    pass
+
+
+class AsyncConnectionPool:
+    """
+    Pool of native async connections for one database alias.
+
+    Connections are opened lazily up to ``max_size``, ``min_size`` of them are opened on the first checkout.
+    Idle connections older than ``max_idle`` seconds are recycled and, with ``pre_ping``,
+    every connection is checked with ``SELECT 1`` before it is handed out.
+    """
+
+    def __init__(self, driver, min_size=0, max_size=10, acquire_timeout=None, max_idle=None, pre_ping=False):
+        self.driver = driver
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_idle = max_idle
+        self.pre_ping = pre_ping
+        self.loop = asyncio.get_running_loop()
+        self._idle = deque()
+        self._condition = asyncio.Condition()
+        self._opened = False
+        self.size = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.acquire_time_total = 0.0
+        self.acquire_time_max = 0.0
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "acquire_time_total": self.acquire_time_total,
+            "acquire_time_avg": self.acquire_time_total / self.acquired if self.acquired else 0.0,
+            "acquire_time_max": self.acquire_time_max,
+        }
+
+    async def _open(self):
+        self._opened = True
+        while self.size < self.min_size:
+            self.size += 1
+            try:
+                conn = await self.driver.connect()
+            except BaseException:
+                self.size -= 1
+                raise
+            self._idle.append((conn, time.monotonic()))
+
+    async def _close_connection(self, conn):
+        try:
+            await self.driver.close(conn)
+        except Exception:
+            pass
+
+    async def _close(self, conn):
+        self.size -= 1
+        await self._close_connection(conn)
+
+    async def _is_alive(self, conn):
+        try:
+            await self.driver.fetch(conn, "SELECT 1", [])
+        except Exception:
+            return False
+        return True
+
+    async def _checkout(self):
+        while True:
+            async with self._condition:
+                if not self._opened:
+                    await self._open()
+                while not self._idle and self.size >= self.max_size:
+                    await self._condition.wait()
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                else:
+                    conn, released_at = None, None
+                    self.size += 1
+
+            if conn is None:
+                try:
+                    return await self.driver.connect()
+                except BaseException:
+                    await self._forget()
+                    raise
+            try:
+                expired = self.max_idle is not None and time.monotonic() - released_at > self.max_idle
+                if not expired and not (self.pre_ping and not await self._is_alive(conn)):
+                    return conn
+            except BaseException:
+                # e.g. the acquire timeout cancelled the pre-ping: the connection is dropped, not leaked
+                await self._forget()
+                asyncio.ensure_future(self._close_connection(conn))
+                raise
+            await self._close(conn)
+
+    async def _forget(self):
+        async with self._condition:
+            self.size -= 1
+            self._condition.notify()
+
+    async def acquire(self):
+        started_at = time.monotonic()
+        self.waiting += 1
+        try:
+            conn = await asyncio.wait_for(self._checkout(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolTimeoutError(f"Could not acquire a connection in {self.acquire_timeout} seconds")
+        finally:
+            self.waiting -= 1
+        acquire_time = time.monotonic() - started_at
+        self.in_use += 1
+        self.acquired += 1
+        self.acquire_time_total += acquire_time
+        self.acquire_time_max = max(self.acquire_time_max, acquire_time)
+        return conn
+
+    async def release(self, conn):
+        async with self._condition:
+            self.in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    async def discard(self, conn):
+        self.in_use -= 1
+        await self._close(conn)
+        async with self._condition:
+            self._condition.notify()
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            # the state of a connection interrupted mid query is unknown
+            await self.discard(conn)
+            raise
+        await self.release(conn)
+
+    async def close(self):
+        async with self._condition:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                await self._close(conn)
+
+
+_pools = {}
+
+
+def get_pool(using, driver):
+    """
+    Returns the pool of the database alias configured with ``DATABASES[using]["ASYNC_POOL"]``:
+    ``MIN_SIZE``, ``MAX_SIZE``, ``ACQUIRE_TIMEOUT``, ``MAX_IDLE`` and ``PRE_PING``.
+    """
+    pool = _pools.get(using)
+    if pool is None or pool.loop is not asyncio.get_running_loop():
+        options = connections[using].settings_dict.get("ASYNC_POOL") or {}
+        pool = _pools[using] = AsyncConnectionPool(
+            driver,
+            min_size=options.get("MIN_SIZE", 0),
+            max_size=options.get("MAX_SIZE", 10),
+            acquire_timeout=options.get("ACQUIRE_TIMEOUT"),
+            max_idle=options.get("MAX_IDLE"),
+            pre_ping=options.get("PRE_PING", False),
+        )
+    return pool
+
+
+async def close_pools():
+    for using in list(_pools):
+        pool = _pools.pop(using)
+        if pool.loop is asyncio.get_running_loop():
+            await pool.close()
+
+
+def get_pool_stats():
+    return {using: pool.stats() for using, pool in _pools.items()}
@@ -1,214 +1,523 @@
-from asgiref.sync import sync_to_async
+import copy
+from functools import partial
+from itertools import islice
 
-from django.db import router
+from django.db import connections, router, transaction
 
-from django_rest_async.db.signals import async_m2m_changed
+from django_rest_async.db.cache import (
+    bump_deleted_versions,
+    bump_model_versions,
+    get_cached_result,
+    get_query_cache_key,
+    set_cached_result,
+)
+from django_rest_async.db.engine import NativeEngineUnsupported, get_engine
+from django_rest_async.db.executor import dedicated_connection, is_pinned, run_in_db_executor
+from django_rest_async.db.flight import single_flight
+from django_rest_async.db.pagination import cursor_page, cursor_paginate, get_total, paginate
+from django_rest_async.db.signals import (
+    async_m2m_bulk_changed,
+    async_m2m_changed,
+    async_post_bulk_delete,
+    async_post_bulk_save,
+    async_pre_bulk_delete,
+    async_pre_bulk_save,
+)
+from django_rest_async.settings import REST_ASYNC_QUERY_COALESCE
 
+CACHED_METHODS = ("get", "count", "exists", "first", "last", "values", "values_list", "query")
 
-class AsyncBaseQuerySet:
-    pipeline = {}
+_missing = object()
+
+
+LAZY_METHODS = CACHED_METHODS + ("pagination_query", "cursor_pagination_query")
+
+
+class QueryCall:
+    """
+    The lazy read of an async queryset returned by the methods of ``qs.lazy()``, e.g. ``qs.lazy().count()``.
+    Awaiting it runs the query, several calls can run together with ``async_batch()``.
+    """
+
+    def __init__(self, queryset, method, args, kwargs):
+        self.queryset = queryset
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+
+    def __await__(self):
+        return self.queryset._execute(self.method, *self.args, **self.kwargs).__await__()
+
+    def __repr__(self):
+        return f"<QueryCall {self.queryset.model.__name__}.{self.method}()>"
 
+
+class LazyReads:
+    """The reads of an async queryset (``get()``, ``count()``, ``exists()``...) returning a ``QueryCall``."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def __getattr__(self, method):
+        if method not in LAZY_METHODS:
+            raise AttributeError(f"{method} is not a lazy read, use one of {', '.join(LAZY_METHODS)}")
+        return lambda *args, **kwargs: QueryCall(self.queryset, method, args, kwargs)
+
+
+class AsyncBaseQuerySet:
     def __init__(self, sync_manager, model):
         self.sync_manager = sync_manager
-        self.key = model.__name__
-
-    def _clean(self):
-        self.pipeline[self.key] = []
+        self.model = model
+        self.operations = ()
+        self.cache_options = None
+        self.coalesced = None
+
+    def _clone(self):
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        return clone
+
+    def _chain(self, fn, args, kwargs):
+        # every chaining call returns a new queryset, so concurrent chains never share operations
+        clone = self._clone()
+        clone.operations = self.operations + ((fn, args, kwargs),)
+        return clone
+
+    def cache(self, ttl=None, key=None):
+        """
+        Caches the results of the reads of the queryset in the ``REST_ASYNC_QUERY_CACHE`` backend for ``ttl`` seconds
+        (``REST_ASYNC_QUERY_CACHE_TTL`` by default), keyed by the compiled SQL and params or by ``key``.
+        The writes made with the async API bump the versions of their tables, so stale results are never read
+        in this process. Prefetching querysets and the reads of a pinned connection are not cached.
+        """
+        clone = self._clone()
+        clone.cache_options = (ttl, key)
+        return clone
+
+    def coalesce(self, enabled=True):
+        """
+        Identical reads of the queryset (same SQL and params) running concurrently share one query,
+        the callers arriving while it runs get a copy of its result. ``REST_ASYNC_QUERY_COALESCE`` by default.
+        """
+        clone = self._clone()
+        clone.coalesced = enabled
+        return clone
+
+    def lazy(self):
+        """
+        Returns the reads of the queryset as lazy calls instead of coroutines, to run them with ``async_batch()``:
+        ``await async_batch(qs.lazy().count(), qs.lazy().first())``.
+        """
+        return LazyReads(self)
+
+    def _get_coalesce_key(self, method, qs, args, kwargs, cache_key):
+        coalesced = REST_ASYNC_QUERY_COALESCE if self.coalesced is None else self.coalesced
+        if not coalesced or method not in CACHED_METHODS or is_pinned(qs.db):
+            return None
+        return cache_key or get_query_cache_key(qs, method, args, kwargs)
+
+    def _get_cache_key(self, method, qs, args, kwargs):
+        if self.cache_options is None or method not in CACHED_METHODS or is_pinned(qs.db):
+            return None
+        return get_query_cache_key(qs, method, args, kwargs, key=self.cache_options[1])
+
+    def _set_cached_result(self, cache_key, result):
+        if cache_key is not None:
+            set_cached_result(cache_key, result, self.cache_options[0])
 
     def _perform(self):
         qs = self.sync_manager.all()
-        for operation in self.pipeline.get(self.key) or []:
-            qs = getattr(qs, operation["fn"])(*operation["args"], **operation["kwargs"])
-        self._clean()
+        for fn, args, kwargs in self.operations:
+            if fn == "all":
+                # a clone would drop the rows prefetched on a related manager
+                continue
+            qs = getattr(qs, fn)(*args, **kwargs)
         return qs
 
     def all(self, *args, **kwargs):
-        if self.key not in self.pipeline:
-            self._clean()
-
-        self.pipeline[self.key].append(
-            {
-                "fn": "all",
-                "args": args,
-                "kwargs": kwargs,
-            }
-        )
-        return self
+        return self._chain("all", args, kwargs)
 
     def filter(self, *args, **kwargs):
-        if self.key not in self.pipeline:
-            self._clean()
-
-        self.pipeline[self.key].append(
-            {
-                "fn": "filter",
-                "args": args,
-                "kwargs": kwargs,
-            }
-        )
-        return self
+        return self._chain("filter", args, kwargs)
 
     def exclude(self, *args, **kwargs):
-        if self.key not in self.pipeline:
-            self._clean()
-
-        self.pipeline[self.key].append(
-            {
-                "fn": "exclude",
-                "args": args,
-                "kwargs": kwargs,
-            }
-        )
-        return self
+        return self._chain("exclude", args, kwargs)
 
     def select_related(self, *args, **kwargs):
-        if self.key not in self.pipeline:
-            self._clean()
-
-        self.pipeline[self.key].append(
-            {
-                "fn": "select_related",
-                "args": args,
-                "kwargs": kwargs,
-            }
-        )
-        return self
+        return self._chain("select_related", args, kwargs)
 
     def prefetch_related(self, *args, **kwargs):
-        if self.key not in self.pipeline:
-            self._clean()
-
-        self.pipeline[self.key].append(
-            {
-                "fn": "prefetch_related",
-                "args": args,
-                "kwargs": kwargs,
-            }
-        )
-        return self
+        return self._chain("prefetch_related", args, kwargs)
 
     def order_by(self, *args, **kwargs):
-        if self.key not in self.pipeline:
-            self._clean()
-
-        self.pipeline[self.key].append(
-            {
-                "fn": "order_by",
-                "args": args,
-                "kwargs": kwargs,
-            }
-        )
-        return self
+        return self._chain("order_by", args, kwargs)
 
     def distinct(self, *args, **kwargs):
-        if self.key not in self.pipeline:
-            self._clean()
-
-        self.pipeline[self.key].append(
-            {
-                "fn": "distinct",
-                "args": args,
-                "kwargs": kwargs,
-            }
-        )
-        return self
+        return self._chain("distinct", args, kwargs)
+
+    def only(self, *args, **kwargs):
+        return self._chain("only", args, kwargs)
+
+    def defer(self, *args, **kwargs):
+        return self._chain("defer", args, kwargs)
 
-    @sync_to_async(thread_sensitive=True)
-    def get(self, *args, **kwargs):
+    def _execute_sync(self, method, qs, args, kwargs):
+        return getattr(self, f"_{method}")(qs, *args, **kwargs)
+
+    @staticmethod
+    def _is_prefetched(method, qs):
+        return method in ("query", "count", "exists") and qs._result_cache is not None
+
+    async def _execute(self, method, *args, **kwargs):
         qs = self._perform()
+        if self._is_prefetched(method, qs):
+            # e.g. the prefetched rows of a related manager: nothing is read from the database
+            return self._execute_sync(method, qs, args, kwargs)
+        cache_key = self._get_cache_key(method, qs, args, kwargs)
+        if cache_key is not None:
+            result = get_cached_result(cache_key, _missing)
+            if result is not _missing:
+                return result
+        coalesce_key = self._get_coalesce_key(method, qs, args, kwargs, cache_key)
+        if coalesce_key is not None:
+            result, ran = await single_flight(coalesce_key, partial(self._execute_uncached, method, qs, args, kwargs))
+            if not ran:
+                return copy.deepcopy(result)
+        else:
+            result = await self._execute_uncached(method, qs, args, kwargs)
+        self._set_cached_result(cache_key, result)
+        return result
+
+    async def _execute_uncached(self, method, qs, args, kwargs):
+        engine = get_engine(qs.db)
+        if engine is not None and hasattr(engine, method) and not is_pinned(qs.db):
+            try:
+                return await getattr(engine, method)(qs, *args, **kwargs)
+            except NativeEngineUnsupported:
+                pass
+        return await run_in_db_executor(qs.db, self._execute_sync, method, qs, args, kwargs)
+
+    async def _iterate(self, method, chunk_size, args, kwargs):
+        qs = self._perform()
+        if method == "query" and qs._result_cache is not None:
+            for item in qs._result_cache:
+                yield item
+            return
+        engine = get_engine(qs.db)
+        if engine is not None and not is_pinned(qs.db):
+            try:
+                statement = getattr(engine, f"prepare_{method}")(qs, *args, **kwargs)
+            except NativeEngineUnsupported:
+                statement = None
+            if statement is not None:
+                async for chunk in engine.iterate(statement, chunk_size):
+                    for item in chunk:
+                        yield item
+                return
+
+        if method != "query":
+            qs = getattr(qs, method)(*args, **kwargs)
+        async with dedicated_connection(qs.db) as run:
+            # the cursor stays open on the dedicated thread, every chunk costs one hop
+            iterator = qs.iterator(chunk_size=chunk_size)
+            try:
+                while True:
+                    chunk = await run(lambda: list(islice(iterator, chunk_size)))
+                    if not chunk:
+                        break
+                    for item in chunk:
+                        yield item
+            finally:
+                await run(iterator.close)
+
+    def _get(self, qs, *args, **kwargs):
         return qs.get(*args, **kwargs)
 
-    @sync_to_async(thread_sensitive=True)
-    def count(self, *args, **kwargs):
-        qs = self._perform()
+    def _count(self, qs, *args, **kwargs):
         return qs.count(*args, **kwargs)
 
-    @sync_to_async(thread_sensitive=True)
-    def update(self, *args, **kwargs):
-        qs = self._perform()
-        return qs.update(*args, **kwargs)
+    def _update(self, qs, *args, **kwargs):
+        result = qs.update(*args, **kwargs)
+        bump_model_versions(qs.model)
+        return result
 
-    @sync_to_async(thread_sensitive=True)
-    def delete(self, *args, **kwargs):
-        qs = self._perform()
-        return qs.delete(*args, **kwargs)
+    def _delete(self, qs, *args, **kwargs):
+        result = qs.delete(*args, **kwargs)
+        bump_deleted_versions(result)
+        return result
 
-    @sync_to_async(thread_sensitive=True)
-    def exists(self, *args, **kwargs):
-        qs = self._perform()
+    def _exists(self, qs, *args, **kwargs):
         return qs.exists(*args, **kwargs)
 
-    @sync_to_async(thread_sensitive=True)
-    def first(self, *args, **kwargs):
-        qs = self._perform()
+    def _first(self, qs, *args, **kwargs):
         return qs.first(*args, **kwargs)
 
-    @sync_to_async(thread_sensitive=True)
-    def last(self, *args, **kwargs):
-        qs = self._perform()
+    def _last(self, qs, *args, **kwargs):
         return qs.last(*args, **kwargs)
 
-    @sync_to_async(thread_sensitive=True)
-    def values(self, *args, **kwargs):
-        qs = self._perform()
+    def _values(self, qs, *args, **kwargs):
         return [i for i in qs.values(*args, **kwargs)]
 
-    @sync_to_async(thread_sensitive=True)
-    def values_list(self, *args, **kwargs):
-        qs = self._perform()
+    def _values_list(self, qs, *args, **kwargs):
         return [i for i in qs.values_list(*args, **kwargs)]
 
-    @sync_to_async(thread_sensitive=True)
-    def query(self, *args, **kwargs):
-        qs = self._perform()
+    def _query(self, qs, *args, **kwargs):
         return [i for i in qs]
 
-    @sync_to_async(thread_sensitive=True)
-    def pagination_query(self, order_by=None, limit=None, offset=0):
-        qs = self._perform()
-        total = qs.count()
-        if order_by:
-            qs = qs.order_by(*order_by)
-        if limit:
-            qs = qs[offset : offset + limit]  # noqa
+    def _pagination_query(self, qs, order_by=None, limit=None, offset=0, total=None):
+        total, total_exact = get_total(qs, total)
         return {
-            "results": [i for i in qs],
+            "results": [i for i in paginate(qs, order_by, limit, offset)],
             "total": total,
+            "total_exact": total_exact,
             "order_by": order_by,
             "limit": limit,
             "offset": offset,
         }
 
+    def __aiter__(self):
+        return self.aiterator()
+
+    def aiterator(self, chunk_size=2000):
+        return self._iterate("query", chunk_size, (), {})
+
+    def avalues_iter(self, *args, chunk_size=2000, **kwargs):
+        return self._iterate("values", chunk_size, args, kwargs)
+
+    def avalues_list_iter(self, *args, chunk_size=2000, **kwargs):
+        return self._iterate("values_list", chunk_size, args, kwargs)
+
+    def _cursor_pagination_query(self, qs, order_by=None, limit=None, cursor=None):
+        qs, ordering, direction = cursor_paginate(qs, order_by, limit, cursor)
+        return cursor_page(qs, ordering, direction, order_by, limit)
+
+    async def get(self, *args, **kwargs):
+        return await self._execute("get", *args, **kwargs)
+
+    async def count(self, *args, **kwargs):
+        return await self._execute("count", *args, **kwargs)
+
+    async def update(self, *args, **kwargs):
+        return await self._execute("update", *args, **kwargs)
+
+    async def delete(self, *args, **kwargs):
+        return await self._execute("delete", *args, **kwargs)
+
+    async def exists(self, *args, **kwargs):
+        return await self._execute("exists", *args, **kwargs)
+
+    async def first(self, *args, **kwargs):
+        return await self._execute("first", *args, **kwargs)
+
+    async def last(self, *args, **kwargs):
+        return await self._execute("last", *args, **kwargs)
+
+    async def values(self, *args, **kwargs):
+        return await self._execute("values", *args, **kwargs)
+
+    async def values_list(self, *args, **kwargs):
+        return await self._execute("values_list", *args, **kwargs)
+
+    async def query(self, *args, **kwargs):
+        return await self._execute("query", *args, **kwargs)
+
+    async def pagination_query(self, order_by=None, limit=None, offset=0, total=None):
+        """
+        Offset pagination, ``total`` is the strategy of the total (``exact``, ``cached``, ``estimated``
+        or ``none``, ``REST_ASYNC_PAGINATION_TOTAL`` by default), ``total_exact`` tells if it is exact.
+        """
+        return await self._execute("pagination_query", order_by=order_by, limit=limit, offset=offset, total=total)
+
+    async def cursor_pagination_query(self, order_by=None, limit=None, cursor=None):
+        """
+        Keyset pagination: pages with signed opaque cursors of the last row sort key values
+        instead of an offset and a count. ``pk`` is always the last tiebreaker of the ordering.
+        """
+        return await self._execute("cursor_pagination_query", order_by=order_by, limit=limit, cursor=cursor)
+
 
 class AsyncQuerySet(AsyncBaseQuerySet):
     def __init__(self, model=None, query=None, using=None, hints=None):
         sync_manager = model.objects
         super().__init__(sync_manager, model)
 
-    @sync_to_async(thread_sensitive=True)
-    def create(self, *args, **kwargs):
-        self._clean()
-        return self.sync_manager.create(*args, **kwargs)
-
-    @sync_to_async(thread_sensitive=True)
-    def get_or_create(self, *args, **kwargs):
-        self._clean()
-        return self.sync_manager.get_or_create(*args, **kwargs)
-
-    @sync_to_async(thread_sensitive=True)
-    def update_or_create(self, *args, **kwargs):
-        self._clean()
-        return self.sync_manager.update_or_create(*args, **kwargs)
-
-    @sync_to_async(thread_sensitive=True)
-    def bulk_create(self, *args, **kwargs):
-        self._clean()
-        return self.sync_manager.bulk_create(*args, **kwargs)
+    async def _write(self, fn, *args, **kwargs):
+        result = await run_in_db_executor(router.db_for_write(self.model), fn, *args, **kwargs)
+        bump_model_versions(self.model)
+        return result
+
+    async def create(self, *args, **kwargs):
+        return await self._write(self.sync_manager.create, *args, **kwargs)
+
+    async def get_or_create(self, *args, **kwargs):
+        return await self._write(self.sync_manager.get_or_create, *args, **kwargs)
+
+    async def update_or_create(self, *args, **kwargs):
+        return await self._write(self.sync_manager.update_or_create, *args, **kwargs)
+
+    async def bulk_create(self, *args, **kwargs):
+        return await self._write(self.sync_manager.bulk_create, *args, **kwargs)
+
+    async def bulk_update(self, *args, **kwargs):
+        return await self._write(self.sync_manager.bulk_update, *args, **kwargs)
+
+    def _bulk_save(self, objs, created, using, batch_size):
+        fields = [field.name for field in self.model._meta.concrete_fields if not field.primary_key]
+        # e.g. sqlite before django 4.0: the inserted rows do not get their pks back from bulk_create()
+        returns_pks = connections[using].features.can_return_rows_from_bulk_insert
+        with transaction.atomic(using=using):
+            for start in range(0, len(objs), batch_size):
+                end = start + batch_size
+                chunk, chunk_created = objs[start:end], created[start:end]
+                new_objs = [obj for obj, is_created in zip(chunk, chunk_created) if is_created]
+                existing_objs = [obj for obj, is_created in zip(chunk, chunk_created) if not is_created]
+                if not returns_pks:
+                    for obj in [obj for obj in new_objs if obj.pk is None]:
+                        obj.save(force_insert=True, using=using)
+                    new_objs = [obj for obj in new_objs if obj._state.adding]
+                if new_objs:
+                    self.sync_manager.using(using).bulk_create(new_objs)
+                if existing_objs and fields:
+                    self.sync_manager.using(using).bulk_update(existing_objs, fields)
+
+    async def bulk_save(self, objs, batch_size=1000):
+        """
+        Inserts the new (``_state.adding``) and updates the existing instances in one thread hop and transaction,
+        ``batch_size`` rows per query. ``save()`` and the per instance signals are not called,
+        ``async_pre_bulk_save``/``async_post_bulk_save`` are sent once with all the instances.
+        When the database does not return the pks of bulk inserts, the new instances without a pk are inserted
+        with ``save()`` one by one (in the same hop and transaction) to get their pk.
+        Returns the ``created`` flag of every instance.
+        """
+        objs = list(objs)
+        if not objs:
+            return []
+        using = router.db_for_write(self.model)
+        created = [obj._state.adding for obj in objs]
+        await async_pre_bulk_save.async_send(sender=self.model, instances=objs, created=created, using=using)
+        await run_in_db_executor(using, self._bulk_save, objs, created, using, batch_size)
+        bump_model_versions(self.model)
+        await async_post_bulk_save.async_send(sender=self.model, instances=objs, created=created, using=using)
+        return created
+
+    def _bulk_delete(self, pks, using, batch_size):
+        deleted, counts = 0, {}
+        with transaction.atomic(using=using):
+            for start in range(0, len(pks), batch_size):
+                end = start + batch_size
+                chunk_deleted, chunk_counts = self.sync_manager.using(using).filter(pk__in=pks[start:end]).delete()
+                deleted += chunk_deleted
+                for label, count in chunk_counts.items():
+                    counts[label] = counts.get(label, 0) + count
+        return deleted, counts
+
+    async def bulk_delete(self, objs, batch_size=1000):
+        """
+        Deletes the instances (and their cascades) in one thread hop and transaction, ``batch_size`` rows per query.
+        ``async_pre_bulk_delete``/``async_post_bulk_delete`` are sent once with all the instances.
+        Returns the deleted counts like ``QuerySet.delete()``.
+        """
+        objs = list(objs)
+        if not objs:
+            return 0, {}
+        using = router.db_for_write(self.model)
+        await async_pre_bulk_delete.async_send(sender=self.model, instances=objs, using=using)
+        result = await run_in_db_executor(using, self._bulk_delete, [obj.pk for obj in objs], using, batch_size)
+        bump_deleted_versions(result)
+        await async_post_bulk_delete.async_send(sender=self.model, instances=objs, using=using)
+        return result
+
+    def _get_m2m_through(self, field_name):
+        field = self.model._meta.get_field(field_name)
+        through = field.remote_field.through
+        source = through._meta.get_field(field.m2m_field_name())
+        target = through._meta.get_field(field.m2m_reverse_field_name())
+        return through, source.attname, target.attname, field.related_model
+
+    @staticmethod
+    def _get_m2m_rows(through, source_attname, target_attname, source_ids, using):
+        # source id -> {target id: through pk}
+        rows = {}
+        queryset = through._base_manager.using(using).filter(**{f"{source_attname}__in": source_ids})
+        for pk, source_id, target_id in queryset.values_list("pk", source_attname, target_attname):
+            rows.setdefault(source_id, {})[target_id] = pk
+        return rows
+
+    @staticmethod
+    def _apply_m2m_rows(through, source_attname, target_attname, added, removed_pks, using):
+        with transaction.atomic(using=using):
+            if removed_pks:
+                through._base_manager.using(using).filter(pk__in=removed_pks).delete()
+            if added:
+                through._base_manager.using(using).bulk_create(
+                    [
+                        through(**{source_attname: source_id, target_attname: target_id})
+                        for source_id, target_id in added
+                    ]
+                )
+
+    async def _m2m_bulk(self, field_name, mapping, mode, batch_size):
+        through, source_attname, target_attname, target_model = self._get_m2m_through(field_name)
+        using = router.db_for_write(through)
+        mapping = {source_id: set(target_ids) for source_id, target_ids in mapping.items()}
+        rows = await run_in_db_executor(
+            using, self._get_m2m_rows, through, source_attname, target_attname, list(mapping), using
+        )
 
-    @sync_to_async(thread_sensitive=True)
-    def bulk_update(self, *args, **kwargs):
-        self._clean()
-        return self.sync_manager.bulk_update(*args, **kwargs)
+        # (source id, target id, through pk) of the rows to remove, (source id, target id) of the rows to add,
+        # sorted so the batches do not depend on the order of the sets
+        removed, added = [], []
+        for source_id, target_ids in mapping.items():
+            current = rows.get(source_id, {})
+            if mode == "remove":
+                removed.extend((source_id, id, current[id]) for id in sorted(target_ids & current.keys()))
+            if mode == "set":
+                removed.extend((source_id, id, current[id]) for id in sorted(current.keys() - target_ids))
+            if mode != "remove":
+                added.extend((source_id, id) for id in sorted(target_ids - current.keys()))
+
+        for action, rows in (("remove", removed), ("add", added)):
+            rows = iter(rows)
+            while batch := list(islice(rows, batch_size)):
+                pk_map = {}
+                for source_id, target_id, *_ in batch:
+                    pk_map.setdefault(source_id, set()).add(target_id)
+                signal_kwargs = dict(
+                    sender=through,
+                    model=target_model,
+                    pk_set={target_id for _, target_id, *_ in batch},
+                    pk_map=pk_map,
+                    using=using,
+                )
+                await async_m2m_bulk_changed.async_send(action=f"pre_{action}", **signal_kwargs)
+                if action == "remove":
+                    changes = [], [pk for _, _, pk in batch]
+                else:
+                    changes = batch, []
+                await run_in_db_executor(
+                    using, self._apply_m2m_rows, through, source_attname, target_attname, *changes, using
+                )
+                bump_model_versions(through)
+                await async_m2m_bulk_changed.async_send(action=f"post_{action}", **signal_kwargs)
+        return {"added": len(added), "removed": len(removed)}
+
+    async def m2m_bulk_set(self, field_name, mapping, batch_size=1000):
+        """
+        Sets the targets of many instances at once: ``mapping`` is ``{instance pk: [target pks]}``.
+        The current rows are read with one query, every batch of ``batch_size`` through rows is removed or added
+        with one query and one ``async_m2m_bulk_changed`` pre/post signal (``pk_set`` holds the batch targets
+        and ``pk_map`` the targets per instance pk), ``async_m2m_changed`` is not sent.
+        Returns the number of added and removed rows.
+        """
+        return await self._m2m_bulk(field_name, mapping, "set", batch_size)
+
+    async def m2m_bulk_add(self, field_name, mapping, batch_size=1000):
+        """Adds the missing targets of many instances at once, see ``m2m_bulk_set``."""
+        return await self._m2m_bulk(field_name, mapping, "add", batch_size)
+
+    async def m2m_bulk_remove(self, field_name, mapping, batch_size=1000):
+        """Removes the existing targets of many instances at once, see ``m2m_bulk_set``."""
+        return await self._m2m_bulk(field_name, mapping, "remove", batch_size)
 
     @classmethod
     def as_manager(cls):
@@ -220,80 +529,134 @@ class AsyncQuerySet(AsyncBaseQuerySet):
         return manager
 
 
-class AsyncManyRelatedQuerySet(AsyncBaseQuerySet):
+class AsyncReverseRelatedQuerySet(AsyncBaseQuerySet):
+    """The async queryset of a reverse foreign key manager, e.g. ``post.async_comment_set``."""
+
     def __init__(self, sync_manager):
-        self.db = router.db_for_write(sync_manager.through, instance=sync_manager.instance)
+        self.db = router.db_for_write(sync_manager.model, instance=sync_manager.instance)
         super().__init__(sync_manager, sync_manager.model)
 
-    @sync_to_async(thread_sensitive=True)
-    def _set(self, *args, **kwargs):
-        self.sync_manager.set(*args, **kwargs)
+    async def _write(self, fn, *args, **kwargs):
+        result = await run_in_db_executor(self.db, fn, *args, **kwargs)
+        bump_model_versions(self.model)
+        return result
 
-    @sync_to_async(thread_sensitive=True)
-    def _add(self, *args, **kwargs):
-        self.sync_manager.add(*args, **kwargs)
+    async def create(self, *args, **kwargs):
+        return await self._write(self.sync_manager.create, *args, **kwargs)
 
-    @sync_to_async(thread_sensitive=True)
-    def _clear(self, *args, **kwargs):
-        self.sync_manager.clear(*args, **kwargs)
+    async def get_or_create(self, *args, **kwargs):
+        return await self._write(self.sync_manager.get_or_create, *args, **kwargs)
 
-    @sync_to_async(thread_sensitive=True)
-    def _remove(self, *args, **kwargs):
-        self.sync_manager.remove(*args, **kwargs)
+    async def update_or_create(self, *args, **kwargs):
+        return await self._write(self.sync_manager.update_or_create, *args, **kwargs)
 
-    @sync_to_async(thread_sensitive=True)
-    def _get_missing_target_ids(self, *args, **kwargs):
-        return self.sync_manager._get_missing_target_ids(*args, **kwargs)
+    async def add(self, *args, **kwargs):
+        await self._write(self.sync_manager.add, *args, **kwargs)
 
     async def set(self, *args, **kwargs):
-        await self._set(*args, **kwargs)
+        await self._write(self.sync_manager.set, *args, **kwargs)
 
-    async def add(self, *args, **kwargs):
-        objs = args
-        target_ids = self.sync_manager._get_target_ids(self.sync_manager.target_field_name, objs)
-        missing_target_ids = await self._get_missing_target_ids(
-            self.sync_manager.source_field_name, self.sync_manager.target_field_name, self.db, target_ids
-        )
+    async def remove(self, *args, **kwargs):
+        # only nullable foreign keys have remove() and clear()
+        await self._write(self.sync_manager.remove, *args, **kwargs)
+
+    async def clear(self, *args, **kwargs):
+        await self._write(self.sync_manager.clear, *args, **kwargs)
+
+
+class AsyncManyRelatedQuerySet(AsyncBaseQuerySet):
+    def __init__(self, sync_manager):
+        self.db = router.db_for_write(sync_manager.through, instance=sync_manager.instance)
+        super().__init__(sync_manager, sync_manager.model)
+
+    async def _add(self, *args, **kwargs):
+        await run_in_db_executor(self.db, self.sync_manager.add, *args, **kwargs)
+        bump_model_versions(self.sync_manager.through)
+
+    async def _clear(self, *args, **kwargs):
+        await run_in_db_executor(self.db, self.sync_manager.clear, *args, **kwargs)
+        bump_model_versions(self.sync_manager.through)
+
+    async def _remove(self, *args, **kwargs):
+        await run_in_db_executor(self.db, self.sync_manager.remove, *args, **kwargs)
+        bump_model_versions(self.sync_manager.through)
+
+    async def _get_missing_target_ids(self, *args, **kwargs):
+        return await run_in_db_executor(self.db, self.sync_manager._get_missing_target_ids, *args, **kwargs)
+
+    async def _send_m2m_changed(self, action, pk_set):
         await async_m2m_changed.async_send(
             sender=self.sync_manager.through,
-            action="pre_add",
+            action=action,
             instance=self.sync_manager.instance,
             reverse=self.sync_manager.reverse,
             model=self.sync_manager.model,
-            pk_set=missing_target_ids,
+            pk_set=pk_set,
             using=self.db,
         )
-        await self._add(*args, **kwargs)
-        await async_m2m_changed.async_send(
-            sender=self.sync_manager.through,
-            action="post_add",
-            instance=self.sync_manager.instance,
-            reverse=self.sync_manager.reverse,
-            model=self.sync_manager.model,
-            pk_set=missing_target_ids,
-            using=self.db,
+
+    def _get_current_target_ids(self):
+        target_attname = self.sync_manager.target_field.target_field.attname
+        return set(self.sync_manager.using(self.db).values_list(target_attname, flat=True))
+
+    def _set(self, target_ids, clear, through_defaults):
+        # the diff and the writes run in one transaction like the sync set(), a concurrent writer or a failure
+        # can not leave it half applied
+        with transaction.atomic(using=self.db, savepoint=False):
+            if clear:
+                self.sync_manager.clear()
+                old_ids = set()
+            else:
+                old_ids = self._get_current_target_ids()
+            removed_ids = old_ids - target_ids
+            added_ids = target_ids - old_ids
+            if removed_ids:
+                self.sync_manager.remove(*removed_ids)
+            if added_ids:
+                self.sync_manager.add(*added_ids, through_defaults=through_defaults)
+        return removed_ids, added_ids
+
+    async def set(self, objs, *, clear=False, through_defaults=None):
+        """
+        Like the sync ``set()``: with ``clear`` it clears then adds, otherwise it removes and adds the difference
+        with the current targets, in one thread hop and transaction. The ``async_m2m_changed`` pre signals are sent
+        before it with the difference read beforehand, the post signals after it with the applied difference.
+        """
+        target_ids = self.sync_manager._get_target_ids(self.sync_manager.target_field_name, tuple(objs))
+        if clear:
+            await self._send_m2m_changed("pre_clear", None)
+            old_ids = set()
+        else:
+            old_ids = await run_in_db_executor(self.db, self._get_current_target_ids)
+        if old_ids - target_ids:
+            await self._send_m2m_changed("pre_remove", old_ids - target_ids)
+        if target_ids - old_ids:
+            await self._send_m2m_changed("pre_add", target_ids - old_ids)
+
+        removed_ids, added_ids = await run_in_db_executor(self.db, self._set, target_ids, clear, through_defaults)
+        bump_model_versions(self.sync_manager.through)
+
+        if clear:
+            await self._send_m2m_changed("post_clear", None)
+        if removed_ids:
+            await self._send_m2m_changed("post_remove", removed_ids)
+        if added_ids:
+            await self._send_m2m_changed("post_add", added_ids)
+
+    async def add(self, *args, **kwargs):
+        objs = args
+        target_ids = self.sync_manager._get_target_ids(self.sync_manager.target_field_name, objs)
+        missing_target_ids = await self._get_missing_target_ids(
+            self.sync_manager.source_field_name, self.sync_manager.target_field_name, self.db, target_ids
         )
+        await self._send_m2m_changed("pre_add", missing_target_ids)
+        await self._add(*args, **kwargs)
+        await self._send_m2m_changed("post_add", missing_target_ids)
 
     async def clear(self, *args, **kwargs):
-        await async_m2m_changed.async_send(
-            sender=self.sync_manager.through,
-            action="pre_clear",
-            instance=self.sync_manager.instance,
-            reverse=self.sync_manager.reverse,
-            model=self.sync_manager.model,
-            pk_set=None,
-            using=self.db,
-        )
+        await self._send_m2m_changed("pre_clear", None)
         await self._clear(*args, **kwargs)
-        await async_m2m_changed.async_send(
-            sender=self.sync_manager.through,
-            action="post_clear",
-            instance=self.sync_manager.instance,
-            reverse=self.sync_manager.reverse,
-            model=self.sync_manager.model,
-            pk_set=None,
-            using=self.db,
-        )
+        await self._send_m2m_changed("post_clear", None)
 
     async def remove(self, *args, **kwargs):
         old_ids = set()
@@ -304,22 +667,6 @@ class AsyncManyRelatedQuerySet(AsyncBaseQuerySet):
                 old_ids.add(fk_val)
             else:
                 old_ids.add(obj)
-        await async_m2m_changed.async_send(
-            sender=self.sync_manager.through,
-            action="pre_remove",
-            instance=self.sync_manager.instance,
-            reverse=self.sync_manager.reverse,
-            model=self.sync_manager.model,
-            pk_set=old_ids,
-            using=self.db,
-        )
+        await self._send_m2m_changed("pre_remove", old_ids)
         await self._remove(*args, **kwargs)
-        await async_m2m_changed.async_send(
-            sender=self.sync_manager.through,
-            action="post_remove",
-            instance=self.sync_manager.instance,
-            reverse=self.sync_manager.reverse,
-            model=self.sync_manager.model,
-            pk_set=old_ids,
-            using=self.db,
-        )
+        await self._send_m2m_changed("post_remove", old_ids)
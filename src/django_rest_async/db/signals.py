@@ -1,20 +1,130 @@
+import asyncio
+import logging
+import weakref
+
 from django.db.models.signals import ModelSignal
+from django.dispatch.dispatcher import NO_RECEIVERS
+
+from django_rest_async.db.executor import unpin_connections
+from django_rest_async.settings import REST_ASYNC_SIGNAL_BACKGROUND_LIMIT, REST_ASYNC_SIGNAL_DISPATCH
+
+logger = logging.getLogger("django_rest_async.signals")
+
+# event loop -> (semaphore, running tasks) of the signals dispatched in the background
+_background = weakref.WeakKeyDictionary()
+
+
+def _get_background():
+    loop = asyncio.get_running_loop()
+    if loop not in _background:
+        _background[loop] = (asyncio.Semaphore(REST_ASYNC_SIGNAL_BACKGROUND_LIMIT), set())
+    return _background[loop]
+
+
+async def _run_in_background(fn, *args):
+    # the receivers do not run in the transaction of the sender
+    unpin_connections()
+    await fn(*args)
+
+
+async def _spawn(fn, *args):
+    semaphore, tasks = _get_background()
+    # backpressure: the sender waits while the limit of running dispatches is reached,
+    # the coroutine is created once a slot is acquired so a cancelled sender leaves nothing behind
+    await semaphore.acquire()
+    task = asyncio.ensure_future(_run_in_background(fn, *args))
+    tasks.add(task)
+
+    def done(task):
+        tasks.discard(task)
+        semaphore.release()
+
+    task.add_done_callback(done)
+    return task
+
+
+async def drain_signals():
+    """
+    Waits for the signals dispatched in the background on the running loop.
+    Nothing calls it for you: call it on shutdown (e.g. in the lifespan shutdown of the ASGI server)
+    so the running receivers are not lost.
+    """
+    _, tasks = _get_background()
+    while tasks:
+        await asyncio.gather(*list(tasks), return_exceptions=True)
 
 
 class AsyncModelSignal(ModelSignal):
-    async def async_send(self, sender, **named):
-        if not self.receivers or self.sender_receivers_cache.get(sender) is object():
+    """
+    A model signal with async receivers.
+
+    ``ordered``: run the receivers one after another instead of concurrently.
+    ``isolate_errors``: return (and log) the receiver errors instead of raising the first one.
+    ``dispatch``: ``inline`` or ``background`` (the receivers run in a bounded set of tasks, errors isolated,
+    ``async_send`` returns at once). The background receivers start right away, concurrently with the rest
+    of the request, not after the response is sent; ``drain_signals()`` waits for them on shutdown.
+    Each option can be set on the signal and overridden per ``async_send``.
+    """
+
+    def __init__(self, *args, ordered=False, isolate_errors=False, dispatch="inline", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ordered = ordered
+        self.isolate_errors = isolate_errors
+        self.dispatch = dispatch
+
+    def _async_live_receivers(self, sender):
+        receivers = self._live_receivers(sender)
+        if isinstance(receivers, tuple):
+            # django >= 5.0 returns the sync and async receivers separately
+            sync_receivers, async_receivers = receivers
+            receivers = [*sync_receivers, *async_receivers]
+        return receivers
+
+    async def _call(self, receiver, sender, isolate_errors, named):
+        try:
+            return await receiver(signal=self, sender=sender, **named)
+        except Exception as e:
+            if not isolate_errors:
+                raise
+            logger.error("Error calling %s in AsyncModelSignal.async_send (%s)", receiver, e, exc_info=e)
+            return e
+
+    async def _send(self, receivers, sender, ordered, isolate_errors, named):
+        if ordered:
+            responses = [await self._call(receiver, sender, isolate_errors, named) for receiver in receivers]
+        else:
+            responses = await asyncio.gather(
+                *[self._call(receiver, sender, isolate_errors, named) for receiver in receivers]
+            )
+        return list(zip(receivers, responses))
+
+    async def async_send(self, sender, ordered=None, isolate_errors=None, dispatch=None, **named):
+        if not self.receivers or self.sender_receivers_cache.get(sender) is NO_RECEIVERS:
+            return []
+        receivers = self._async_live_receivers(sender)
+        if not receivers:
             return []
 
-        return [
-            (receiver, await receiver(signal=self, sender=sender, **named)) for receiver in self._live_receivers(sender)
-        ]
+        ordered = self.ordered if ordered is None else ordered
+        isolate_errors = self.isolate_errors if isolate_errors is None else isolate_errors
+        if (dispatch or self.dispatch) == "background":
+            await _spawn(self._send, receivers, sender, ordered, True, named)
+            return []
+        return await self._send(receivers, sender, ordered, isolate_errors, named)
 
 
 async_pre_save = AsyncModelSignal(use_caching=True)
-async_post_save = AsyncModelSignal(use_caching=True)
+async_post_save = AsyncModelSignal(use_caching=True, dispatch=REST_ASYNC_SIGNAL_DISPATCH)
 
 async_pre_delete = AsyncModelSignal(use_caching=True)
-async_post_delete = AsyncModelSignal(use_caching=True)
+async_post_delete = AsyncModelSignal(use_caching=True, dispatch=REST_ASYNC_SIGNAL_DISPATCH)
 
 async_m2m_changed = AsyncModelSignal(use_caching=True)
+# m2m_bulk_set/add/remove: one signal per batch with the target pks per instance pk (pk_map) instead of an instance
+async_m2m_bulk_changed = AsyncModelSignal(use_caching=True)
+
+async_pre_bulk_save = AsyncModelSignal(use_caching=True)
+async_post_bulk_save = AsyncModelSignal(use_caching=True, dispatch=REST_ASYNC_SIGNAL_DISPATCH)
+
+async_pre_bulk_delete = AsyncModelSignal(use_caching=True)
+async_post_bulk_delete = AsyncModelSignal(use_caching=True, dispatch=REST_ASYNC_SIGNAL_DISPATCH)
@@ -4,20 +4,16 @@ from django.http import QueryDict
 from django.utils.translation import gettext_lazy as _
 
 from django_rest_async.rest.exceptions import RestValidateError
+from django_rest_async.rest.metadata import get_validator_metadata
 
 
 def clean_params(validator_cls: PydanticModel, query_params: QueryDict) -> dict:
-    schema = validator_cls.schema()
-    list_fields = []
-    properties = schema.get("properties") or {}
-    for field in properties:
-        if properties[field].get("type") == "array":
-            list_fields.append(field)
+    list_fields = get_validator_metadata(validator_cls)["list_fields"]
 
     params = {}
     for k in query_params:
         v = query_params.getlist(k)
-        if list_fields and k in list_fields:
+        if k in list_fields:
             params[k] = v
         else:
             params[k] = v[0]
@@ -0,0 +1,78 @@
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+
+from django_rest_async.settings import REST_ASYNC_JSON_CODEC
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+class StdlibCodec:
+    def dumps(self, data) -> bytes:
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    # datetimes are passed through to have the same output as DjangoJSONEncoder
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def __init__(self):
+        self.default = DjangoJSONEncoder().default
+
+    def dumps(self, data) -> bytes:
+        return orjson.dumps(data, default=self.default, option=self.options)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class UjsonCodec:
+    def __init__(self):
+        self.default = DjangoJSONEncoder().default
+
+    def dumps(self, data) -> bytes:
+        return ujson.dumps(data, default=self.default, ensure_ascii=False).encode()
+
+    def loads(self, data):
+        try:
+            return ujson.loads(data)
+        except ujson.JSONDecodeError as e:
+            raise json.JSONDecodeError(str(e), data if isinstance(data, str) else data.decode(errors="replace"), 0)
+
+
+CODECS = {
+    "stdlib": (StdlibCodec, json),
+    "orjson": (OrjsonCodec, orjson),
+    "ujson": (UjsonCodec, ujson),
+}
+
+_codecs = {}
+
+
+def get_json_codec(name: str = None):
+    """
+    Returns the json codec (``REST_ASYNC_JSON_CODEC`` by default): ``stdlib``, ``orjson`` or ``ujson``.
+    Codecs encode to bytes and handle datetime, date, time, timedelta, UUID and Decimal like DjangoJSONEncoder.
+    Decoding errors are raised as ``json.JSONDecodeError``.
+    """
+    name = name or REST_ASYNC_JSON_CODEC
+    if name not in _codecs:
+        if name not in CODECS:
+            raise ImproperlyConfigured(f"Unsupported json codec {name}")
+        codec_cls, module = CODECS[name]
+        if module is None:
+            raise ImproperlyConfigured(f"The {name} json codec requires the {name} package")
+        _codecs[name] = codec_cls()
+    return _codecs[name]
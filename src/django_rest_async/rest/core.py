@@ -1,22 +1,51 @@
+import asyncio
 import json
-from functools import wraps
+import random
+from functools import partial, wraps
 from typing import Sequence, Tuple
 
 from pydantic import BaseModel as PydanticModel
 from pydantic import ValidationError as PydanticValidationError
 
+from django.conf import settings
 from django.db.models import Model as DjangoModel
 from django.http import HttpRequest
 
+from django_rest_async.db.flight import single_flight
+from django_rest_async.db.loader import use_relation_loader
+from django_rest_async.db.pagination import InvalidCursorError
+from django_rest_async.db.queryset import AsyncBaseQuerySet
 from django_rest_async.rest.cleaners import clean_none_values, clean_params
+from django_rest_async.rest.codecs import get_json_codec
 from django_rest_async.rest.exceptions import RestForbiddenError, RestNotFoundError, RestValidateError
 from django_rest_async.rest.helpers import enrich_body, pydantic_errors_to_rest_errors
-from django_rest_async.rest.response import Response
-from django_rest_async.rest.serializers import serialize_django_model
-from django_rest_async.settings import REST_ASYNC_META_FIELD
+from django_rest_async.rest.planner import plan_queryset, query_values
+from django_rest_async.rest.response import ASYNC_STREAMING, Response, StreamingResponse
+from django_rest_async.rest.serializers import serialize_django_models
+from django_rest_async.settings import REST_ASYNC_META_FIELD, REST_ASYNC_OUTPUT_SAMPLE_RATE, REST_ASYNC_TRUSTED_OUTPUT
 
 
-def rest_view(methods: Sequence, response_cls=None):
+def get_request_scope(request: HttpRequest) -> tuple:
+    """The credentials of a request: requests of the same scope get the same response from a coalesced view."""
+    return request.headers.get("Authorization"), request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+
+
+async def _run_view(fn, coalesce: bool, request: HttpRequest, *args, **kwargs):
+    if not coalesce or request.method != "GET":
+        return await fn(request, *args, **kwargs)
+    key = (fn, request.get_full_path(), get_request_scope(request), args, tuple(sorted(kwargs.items())))
+    (status_code, body), ran = await single_flight(key, partial(fn, request, *args, **kwargs))
+    if not ran and isinstance(body, StreamingResponse):
+        # a stream is consumed once
+        return await fn(request, *args, **kwargs)
+    return status_code, body
+
+
+def rest_view(methods: Sequence, response_cls=None, coalesce: bool = False):
+    """
+    With ``coalesce``, identical GET requests (same path, query string and ``get_request_scope()``)
+    arriving while one runs share its handler execution and response body.
+    """
     response_cls = response_cls or Response
 
     def decorator(fn):
@@ -27,10 +56,15 @@ def rest_view(methods: Sequence, response_cls=None):
             if request.method not in methods:
                 return response_cls({REST_ASYNC_META_FIELD: "Method not allowed"}, status=405)
             try:
-                status_code, body = await fn(request, *args, **kwargs)
+                status_code, body = await _run_view(fn, coalesce, request, *args, **kwargs)
+                if isinstance(body, StreamingResponse):
+                    body.status_code = status_code
+                    return body if ASYNC_STREAMING else await body.read()
                 return response_cls(body or {}, status=status_code)
             except (RestValidateError, RestForbiddenError, RestNotFoundError) as e:
                 return response_cls(e.errors_dict, status=e.status_code)
+            except InvalidCursorError as e:
+                return response_cls({REST_ASYNC_META_FIELD: [str(e)]}, status=400)
 
         return wrap
 
@@ -71,7 +105,7 @@ def clean_request_body(validator_cls: PydanticModel):
                 if request.content_type == "multipart/form-data":
                     body = {}
                 else:
-                    body = json.loads(request.body)
+                    body = get_json_codec().loads(request.body)
                 validator = validator_cls(**body)
                 body = validator.dict()
                 context["root_raw_data"] = body
@@ -89,14 +123,17 @@ def clean_request_body(validator_cls: PydanticModel):
     return decorator
 
 
-async def _serialize_body(validator_cls: PydanticModel, body: dict, context: dict) -> dict:
+async def _serialize_body(validator_cls: PydanticModel, body: dict, context: dict, trusted: bool = False) -> dict:
     if isinstance(body, DjangoModel):
-        schema = validator_cls.schema()
-        body = await serialize_django_model(body, schema, schema.get("definitions", {}))
+        body = (await serialize_django_models([body], validator_cls))[0]
 
     context["root_raw_data"] = body
     body = await enrich_body(validator_cls, "serialize", body, context)
 
+    if trusted:
+        # the data was read from our own db, it is built without being validated again
+        return validator_cls.construct(**body).dict()
+
     try:
         body = validator_cls(**body).dict()
     except PydanticValidationError as e:
@@ -106,22 +143,70 @@ async def _serialize_body(validator_cls: PydanticModel, body: dict, context: dic
     return body
 
 
-def serialize_response(validator_cls: PydanticModel):
+async def _serialize_bodies(validator_cls: PydanticModel, bodies: list, context: dict, trusted: bool = False) -> list:
+    with use_relation_loader():
+        # the model instances are read at once, one thread hop per relation level,
+        # the loads of the hooks running concurrently for every item are batched by the loader
+        bodies = await serialize_django_models(bodies, validator_cls)
+        return list(
+            await asyncio.gather(
+                *[_serialize_body(validator_cls, body, {**context}, trusted=trusted) for body in bodies]
+            )
+        )
+
+
+def _validate_output(trusted: bool, sample_rate: float) -> bool:
+    if not trusted or settings.DEBUG:
+        return True
+    # a sample of the responses is still validated to catch schema drift
+    return random.random() < sample_rate
+
+
+def serialize_response(
+    validator_cls: PydanticModel, values: bool = False, trusted: bool = None, sample_rate: float = None
+):
+    """
+    ``values``: serve returned querysets with ``values_list()`` when the validator allows it (trusted output).
+    ``trusted``: build the output with ``construct()`` instead of validating it,
+    ``REST_ASYNC_TRUSTED_OUTPUT`` by default. It is always validated in DEBUG.
+    ``sample_rate``: the fraction of trusted responses still validated, ``REST_ASYNC_OUTPUT_SAMPLE_RATE`` by default.
+    """
+
     def decorator(fn):
         fn.response_validator_cls = validator_cls
 
         @wraps(fn)
         async def wrap(request: HttpRequest, *args, **kwargs) -> Tuple[int, dict]:
             status_code, body = await fn(request, *args, **kwargs)
+            if isinstance(body, AsyncBaseQuerySet):
+                body = {"results": body}
+            is_trusted = REST_ASYNC_TRUSTED_OUTPUT if trusted is None else trusted
+            if isinstance(body, dict) and isinstance(body.get("results"), AsyncBaseQuerySet):
+                results = None
+                if values:
+                    # read only the validator columns, no model is instantiated
+                    results = await query_values(body["results"], validator_cls)
+                    if trusted is None:
+                        is_trusted = is_trusted or results is not None
+                if results is None:
+                    # the relations the validator reads are fetched up front instead of once per row
+                    results = await plan_queryset(body["results"], validator_cls).query()
+                body["results"] = results
             body = body or {}
             context = {"request": request}
-            if isinstance(body, dict) and "results" in body:
-                validated_body_items = []
-                for body_item in body["results"]:
-                    validated_body_items.append(await _serialize_body(validator_cls, body_item, context))
-                body["results"] = validated_body_items
+            skip_validation = not _validate_output(
+                is_trusted, REST_ASYNC_OUTPUT_SAMPLE_RATE if sample_rate is None else sample_rate
+            )
+            if isinstance(body, StreamingResponse):
+                # every chunk of the stream is serialized like a page
+                body.serializer = partial(_serialize_bodies, validator_cls, context=context, trusted=skip_validation)
+            elif isinstance(body, dict) and "results" in body:
+                body["results"] = await _serialize_bodies(
+                    validator_cls, body["results"], context, trusted=skip_validation
+                )
             else:
-                body = await _serialize_body(validator_cls, body, context)
+                with use_relation_loader():
+                    body = await _serialize_body(validator_cls, body, context, trusted=skip_validation)
 
             return status_code, body
 
@@ -1,29 +1,27 @@
 from pydantic import BaseModel as PydanticModel
 
+from django_rest_async.rest.metadata import get_validator_metadata
+
 
 async def enrich_body(validator_cls: PydanticModel, method: str, raw_data: dict, context: dict) -> dict:
     if not hasattr(validator_cls, "schema"):
         return raw_data
-    schema = validator_cls.schema()
-    properties = schema["properties"]
-    for field_name, field in properties.items():
-        fn = getattr(validator_cls, f"{method}_{field_name}", None)
+    metadata = get_validator_metadata(validator_cls)
+    hooks = metadata["hooks"][method]
+    nested = metadata["nested"]
+    for field_name in metadata["properties"]:
+        fn = hooks.get(field_name)
         if fn:
             raw_data[field_name] = await fn(raw_data, context=context)
-        field_ref = field.get("$ref")
-        field_items_ref = field.get("items", {}).get("$ref")
-        field_type = field.get("type")
-        if field_items_ref and field_type == "array":
-            if raw_data[field_name]:
-                sub_validator_cls = validator_cls.__fields__[field_name].type_
+        if field_name in nested and raw_data[field_name]:
+            sub_validator_cls, many = nested[field_name]
+            if many:
                 new_items = []
                 for item in raw_data[field_name]:
                     new_item = await enrich_body(sub_validator_cls, method, item, context)
                     new_items.append(new_item)
                 raw_data[field_name] = new_items
-        elif field_ref:
-            if raw_data[field_name]:
-                sub_validator_cls = validator_cls.__fields__[field_name].type_
+            else:
                 raw_data[field_name] = await enrich_body(sub_validator_cls, method, raw_data[field_name], context)
     return raw_data
 
@@ -0,0 +1,40 @@
+from pydantic import BaseModel as PydanticModel
+
+HOOK_METHODS = ("clean", "serialize")
+
+_metadata = {}
+
+
+def _build_metadata(validator_cls: PydanticModel) -> dict:
+    schema = validator_cls.schema()
+    properties = schema.get("properties") or {}
+    metadata = {
+        "schema": schema,
+        "properties": properties,
+        "definitions": schema.get("definitions", {}),
+        "list_fields": frozenset(name for name, field in properties.items() if field.get("type") == "array"),
+        "hooks": {method: {} for method in HOOK_METHODS},
+        "nested": {},
+    }
+    for field_name, field in properties.items():
+        for method in HOOK_METHODS:
+            fn = getattr(validator_cls, f"{method}_{field_name}", None)
+            if fn:
+                metadata["hooks"][method][field_name] = fn
+        field_items_ref = field.get("items", {}).get("$ref")
+        if (field_items_ref and field.get("type") == "array") or field.get("$ref"):
+            # m2m, reverse, fk or o2o field: (sub validator, many)
+            metadata["nested"][field_name] = (validator_cls.__fields__[field_name].type_, field.get("type") == "array")
+    return metadata
+
+
+def get_validator_metadata(validator_cls: PydanticModel) -> dict:
+    """
+    Returns the schema derived metadata of a validator, computed once per class: the schema, its properties
+    and definitions, the list fields, the ``clean_*``/``serialize_*`` hooks and the nested sub validators.
+    """
+    try:
+        return _metadata[validator_cls]
+    except KeyError:
+        metadata = _metadata[validator_cls] = _build_metadata(validator_cls)
+        return metadata
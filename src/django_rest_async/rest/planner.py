@@ -0,0 +1,144 @@
+from pydantic import BaseModel as PydanticModel
+
+from django.db.models import Model
+
+from django_rest_async.db.helpers import get_model_fields
+from django_rest_async.rest.metadata import get_validator_metadata
+
+_plans = {}
+
+
+def _plan(model: Model, schema: dict, definitions: dict, prefix: str, prefetched: bool, plan: dict) -> None:
+    fields = get_model_fields(model)
+    for field_name, field in (schema.get("properties") or {}).items():
+        model_field = fields.get(field_name)
+        path = f"{prefix}{field_name}"
+        field_ref = field.get("$ref")
+        field_items_ref = field.get("items", {}).get("$ref")
+        if field_items_ref and field.get("type") == "array":
+            # m2m or reverse field
+            if model_field is None or not (model_field.many_to_many or model_field.one_to_many):
+                continue
+            plan["prefetch_related"].append(path)
+            sub_schema = definitions[field_items_ref.replace("#/definitions/", "")]
+            _plan(model_field.related_model, sub_schema, definitions, f"{path}__", True, plan)
+        elif field_ref:
+            # fk or o2o field
+            if model_field is None or not (model_field.many_to_one or model_field.one_to_one):
+                continue
+            if prefetched or not model_field.concrete:
+                plan["prefetch_related"].append(path)
+                sub_prefetched = True
+            else:
+                plan["select_related"].append(path)
+                plan["only"].append(path)
+                sub_prefetched = False
+            sub_schema = definitions[field_ref.replace("#/definitions/", "")]
+            _plan(model_field.related_model, sub_schema, definitions, f"{path}__", sub_prefetched, plan)
+        elif not prefetched:
+            if model_field is None or not model_field.concrete:
+                # e.g. a property: it may read any column, so nothing is deferred
+                plan["restrict"] = False
+            else:
+                plan["only"].append(path)
+
+
+def get_query_plan(validator_cls: PydanticModel, model: Model) -> dict:
+    """
+    Returns the ``select_related`` paths (``$ref`` properties: fk and o2o), the ``prefetch_related`` paths
+    (array of ``$ref`` properties: m2m and reverse relations, or anything below them)
+    and the ``only`` columns (None when some property is not a model column) the response validator reads.
+    """
+    key = (validator_cls, model)
+    if key not in _plans:
+        metadata = get_validator_metadata(validator_cls)
+        plan = {"select_related": [], "prefetch_related": [], "only": [], "restrict": True}
+        _plan(model, metadata["schema"], metadata["definitions"], "", False, plan)
+        _plans[key] = {
+            "select_related": plan["select_related"],
+            "prefetch_related": plan["prefetch_related"],
+            "only": plan["only"] if plan["restrict"] else None,
+        }
+    return _plans[key]
+
+
+def plan_queryset(queryset, validator_cls: PydanticModel):
+    """Applies the query plan of the response validator to an async queryset."""
+    plan = get_query_plan(validator_cls, queryset.model)
+    if plan["select_related"]:
+        queryset = queryset.select_related(*plan["select_related"])
+    if plan["prefetch_related"]:
+        queryset = queryset.prefetch_related(*plan["prefetch_related"])
+    if plan["only"]:
+        queryset = queryset.only(*plan["only"])
+    return queryset
+
+
+def _values_plan(model: Model, schema: dict, definitions: dict, prefix: str, columns: list) -> list:
+    # returns the reshape tree: (key, column index, sub tree or None), or None if a property is not a column
+    fields = get_model_fields(model)
+    tree = []
+    for field_name, field in (schema.get("properties") or {}).items():
+        model_field = fields.get(field_name)
+        if model_field is None or not model_field.concrete or model_field.many_to_many:
+            return None
+        field_ref = field.get("$ref")
+        if field_ref:
+            # fk or o2o field: its id column tells apart a null relation
+            if not (model_field.many_to_one or model_field.one_to_one):
+                return None
+            columns.append(f"{prefix}{model_field.attname}")
+            index = len(columns) - 1
+            sub_schema = definitions[field_ref.replace("#/definitions/", "")]
+            sub_tree = _values_plan(
+                model_field.related_model, sub_schema, definitions, f"{prefix}{field_name}__", columns
+            )
+            if sub_tree is None:
+                return None
+            tree.append((field_name, index, sub_tree))
+        elif model_field.is_relation and field_name != model_field.attname:
+            # a relation serialized as a scalar
+            return None
+        else:
+            columns.append(f"{prefix}{field_name}")
+            tree.append((field_name, len(columns) - 1, None))
+    return tree
+
+
+def get_values_plan(validator_cls: PydanticModel, model: Model) -> dict:
+    """
+    Returns the ``values_list`` columns (with fk and o2o join paths) the response validator reads
+    and the tree to reshape the flat rows into nested dicts, or None when some property is not a column
+    reachable through fk or o2o fields (e.g. a property, a m2m or a reverse relation).
+    """
+    key = (validator_cls, model, "values")
+    if key not in _plans:
+        metadata = get_validator_metadata(validator_cls)
+        columns = []
+        tree = _values_plan(model, metadata["schema"], metadata["definitions"], "", columns)
+        _plans[key] = {"columns": columns, "tree": tree} if tree is not None else None
+    return _plans[key]
+
+
+def _reshape(tree: list, row: tuple) -> dict:
+    data = {}
+    for key, index, sub_tree in tree:
+        if sub_tree is None:
+            data[key] = row[index]
+        elif row[index] is None:
+            data[key] = None
+        else:
+            data[key] = _reshape(sub_tree, row)
+    return data
+
+
+async def query_values(queryset, validator_cls: PydanticModel) -> list:
+    """
+    Reads the rows of an async queryset as the nested dicts the response validator expects,
+    without instantiating models. Returns None when the validator can not be served from ``values_list``.
+    """
+    plan = get_values_plan(validator_cls, queryset.model)
+    if plan is None:
+        return None
+    rows = await queryset.values_list(*plan["columns"])
+    return [_reshape(plan["tree"], row) for row in rows]
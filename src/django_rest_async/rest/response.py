@@ -1,7 +1,91 @@
-from django.http import JsonResponse
+import json
+
+import django
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+
+from django_rest_async.rest.codecs import get_json_codec
 
 
 class Response(JsonResponse):
-    def __init__(self, data, *args, **kwargs):
+    """
+    A JsonResponse encoded with the json codec (``REST_ASYNC_JSON_CODEC``).
+    With an ``encoder`` or ``json_dumps_params``, the data is encoded with ``json.dumps`` like JsonResponse does.
+    """
+
+    def __init__(self, data, encoder=None, safe=True, json_dumps_params=None, *, codec=None, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
         self.data = data
-        super().__init__(data, *args, **kwargs)
+        kwargs.setdefault("content_type", "application/json")
+        if encoder is None and json_dumps_params is None:
+            content = get_json_codec(codec).dumps(data)
+        elif codec is not None:
+            raise ValueError("The codec can not be used with an encoder or json_dumps_params")
+        else:
+            content = json.dumps(data, cls=encoder or DjangoJSONEncoder, **(json_dumps_params or {}))
+        HttpResponse.__init__(self, content, **kwargs)
+
+
+# django < 4.2 streams only sync iterators
+ASYNC_STREAMING = django.VERSION >= (4, 2)
+
+
+class StreamingResponse(StreamingHttpResponse):
+    """
+    Streams the items of an async iterator as a json array (``format="json"``)
+    or as newline delimited json (``format="ndjson"``), ``chunk_size`` items per chunk.
+    ``serializer`` is an optional coroutine function applied to every chunk (a list of items) before encoding,
+    it returns the list of the serialized items.
+    Before django 4.2 the stream can not be served as is: ``rest_view`` returns ``await response.read()``.
+    """
+
+    content_types = {
+        "json": "application/json",
+        "ndjson": "application/x-ndjson",
+    }
+
+    def __init__(self, iterator, *args, format="json", chunk_size=100, serializer=None, **kwargs):
+        if format not in self.content_types:
+            raise ValueError(f"Unsupported streaming format {format}")
+        self.iterator = iterator
+        self.format = format
+        self.chunk_size = chunk_size
+        self.serializer = serializer
+        kwargs.setdefault("content_type", self.content_types[format])
+        super().__init__(self._stream() if ASYNC_STREAMING else (), *args, **kwargs)
+
+    async def read(self) -> HttpResponse:
+        """Returns a regular response with the whole stream as its content."""
+        response = HttpResponse(b"".join([chunk async for chunk in self._stream()]), status=self.status_code)
+        for header, value in self.items():
+            response[header] = value
+        return response
+
+    def _encode(self, item) -> bytes:
+        return get_json_codec().dumps(item)
+
+    async def _encode_chunk(self, items, separator) -> bytes:
+        if self.serializer is not None:
+            items = await self.serializer(items)
+        return separator.join([self._encode(item) for item in items])
+
+    async def _stream(self):
+        separator = b"," if self.format == "json" else b"\n"
+        chunk = []
+        started = False
+        if self.format == "json":
+            yield b"["
+        async for item in self.iterator:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                yield (separator if started else b"") + await self._encode_chunk(chunk, separator)
+                started = True
+                chunk = []
+        if chunk:
+            yield (separator if started else b"") + await self._encode_chunk(chunk, separator)
+            started = True
+        if self.format == "json":
+            yield b"]"
+        elif started:
+            yield b"\n"
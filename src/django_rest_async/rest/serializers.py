@@ -1,35 +1,145 @@
-from django.db.models import Model
+from typing import Optional
 
-from django_rest_async.db.helpers import get_value_from_db_instance
+from pydantic import BaseModel as PydanticModel
 
+from django.db import router
+from django.db.models import Model, prefetch_related_objects
 
-async def serialize_django_model(instance: Model, schema: dict, definitions: dict) -> dict:
-    data = {}
+from django_rest_async.db.executor import run_in_db_executor
+from django_rest_async.db.helpers import get_model_fields, get_value_from_db_instance_sync, is_relation_loaded
+from django_rest_async.db.loader import get_relation_loader
+from django_rest_async.rest.metadata import get_validator_metadata
+
+_serializer_plans = {}
+
+
+def _compile(schema: dict) -> Optional[dict]:
     properties = schema.get("properties")
     if properties is None:
-        return instance
+        return None
+    plan = {"fields": []}
     for field_name, field in properties.items():
         field_ref = field.get("$ref")
         field_items_ref = field.get("items", {}).get("$ref")
         field_type = field.get("type")
         if field_items_ref and field_type == "array":
             # m2m or reverse field
-            field_items_ref = field_items_ref.replace("#/definitions/", "")
-            child_instances = await get_value_from_db_instance(instance, field_name, many=True)
-            serialized_items = []
-            for child_instance in child_instances:
-                item = await serialize_django_model(child_instance, definitions[field_items_ref], definitions)
-                serialized_items.append(item)
-            data[field_name] = serialized_items
+            plan["fields"].append((field_name, "many", field_items_ref.replace("#/definitions/", "")))
         elif field_ref:
             # fk or o2o field
-            field_ref = field_ref.replace("#/definitions/", "")
-            child_instance = await get_value_from_db_instance(instance, field_name)
-            if child_instance:
-                data[field_name] = await serialize_django_model(child_instance, definitions[field_ref], definitions)
-            else:
-                data[field_name] = None
+            plan["fields"].append((field_name, "one", field_ref.replace("#/definitions/", "")))
         else:
-            data[field_name] = await get_value_from_db_instance(instance, field_name)
+            plan["fields"].append((field_name, "scalar", None))
+    plan["relations"] = [(field_name, kind, ref) for field_name, kind, ref in plan["fields"] if kind != "scalar"]
+    return plan
+
+
+def compile_serializer_plan(schema: dict, definitions: dict) -> Optional[dict]:
+    """
+    Compiles a response schema into a serializer plan: the ordered fields with their kind
+    (scalar, one or many) and, for the relations, the plans of the nested definitions.
+    """
+    plans = {}
+    plan = _compile(schema)
+    pending = [plan]
+    while pending:
+        current = pending.pop()
+        if current is None:
+            continue
+        current["children"] = {}
+        for field_name, _, ref in current["relations"]:
+            if ref not in plans:
+                plans[ref] = _compile(definitions[ref])
+                pending.append(plans[ref])
+            current["children"][field_name] = plans[ref]
+    return plan
+
+
+def get_serializer_plan(validator_cls: PydanticModel, model: Model) -> Optional[dict]:
+    key = (validator_cls, model)
+    if key not in _serializer_plans:
+        metadata = get_validator_metadata(validator_cls)
+        _serializer_plans[key] = compile_serializer_plan(metadata["schema"], metadata["definitions"])
+    return _serializer_plans[key]
+
+
+def _read_instances(instances: list, plan: dict) -> list:
+    # runs in the db executor: the whole page is read in one thread hop
+    by_model = {}
+    for instance in instances:
+        by_model.setdefault(instance.__class__, []).append(instance)
+    for model, model_instances in by_model.items():
+        fields = get_model_fields(model)
+        for field_name, _, _ in plan["relations"]:
+            field = fields.get(field_name)
+            if field is None or not field.is_relation:
+                continue
+            missing = [instance for instance in model_instances if not is_relation_loaded(instance, field)]
+            if missing:
+                prefetch_related_objects(missing, field_name)
+    return [
+        {
+            field_name: get_value_from_db_instance_sync(instance, field_name, many=kind == "many")
+            for field_name, kind, _ in plan["fields"]
+        }
+        for instance in instances
+    ]
 
-    return data
+
+async def _serialize_instances(instances: list, plan: Optional[dict]) -> list:
+    if plan is None or not instances:
+        return list(instances)
+
+    rows = [None] * len(instances)
+    by_using = {}
+    for index, instance in enumerate(instances):
+        using = instance._state.db or router.db_for_read(instance.__class__, instance=instance)
+        by_using.setdefault(using, []).append(index)
+    loader = get_relation_loader()
+    for using, indexes in by_using.items():
+        using_instances = [instances[index] for index in indexes]
+        if loader is not None:
+            # the reads of the items serialized concurrently (e.g. one by one) share a hop
+            values = await loader.read(using, _read_instances, plan, using_instances)
+        else:
+            values = await run_in_db_executor(using, _read_instances, using_instances, plan)
+        for index, value in zip(indexes, values):
+            rows[index] = value
+
+    # every relation level of the page is serialized at once
+    for field_name, kind, _ in plan["relations"]:
+        children = []
+        for row in rows:
+            if kind == "many":
+                children.extend(row[field_name])
+            elif row[field_name]:
+                children.append(row[field_name])
+        serialized_children = iter(await _serialize_instances(children, plan["children"][field_name]))
+        for row in rows:
+            if kind == "many":
+                row[field_name] = [next(serialized_children) for _ in row[field_name]]
+            elif row[field_name]:
+                row[field_name] = next(serialized_children)
+            else:
+                row[field_name] = None
+    return rows
+
+
+async def serialize_django_models(instances: list, validator_cls: PydanticModel) -> list:
+    """Serializes the django model instances of ``instances`` with the cached plans, other items are kept as is."""
+    by_model = {}
+    for index, instance in enumerate(instances):
+        if isinstance(instance, Model):
+            by_model.setdefault(instance.__class__, []).append(index)
+    items = list(instances)
+    for model, indexes in by_model.items():
+        serialized = await _serialize_instances(
+            [instances[index] for index in indexes], get_serializer_plan(validator_cls, model)
+        )
+        for index, item in zip(indexes, serialized):
+            items[index] = item
+    return items
+
+
+async def serialize_django_model(instance: Model, schema: dict, definitions: dict) -> dict:
+    return (await _serialize_instances([instance], compile_serializer_plan(schema, definitions)))[0]
@@ -2,3 +2,19 @@ from django.conf import settings
 
 REST_ASYNC_META_FIELD = getattr(settings, "REST_ASYNC_META_FIELD", "meta")
 REST_ASYNC_API_DOC_URL = getattr(settings, "REST_ASYNC_API_DOC_URL", "api/doc")
+REST_ASYNC_DB_ENGINE = getattr(settings, "REST_ASYNC_DB_ENGINE", "sync")
+REST_ASYNC_DB_EXECUTOR = getattr(settings, "REST_ASYNC_DB_EXECUTOR", None)
+REST_ASYNC_DEDICATED_THREADS = getattr(settings, "REST_ASYNC_DEDICATED_THREADS", 10)
+REST_ASYNC_PAGINATION_TOTAL = getattr(settings, "REST_ASYNC_PAGINATION_TOTAL", "exact")
+REST_ASYNC_PAGINATION_TOTAL_CACHE_TTL = getattr(settings, "REST_ASYNC_PAGINATION_TOTAL_CACHE_TTL", 60)
+REST_ASYNC_PAGINATION_COUNT_CAP = getattr(settings, "REST_ASYNC_PAGINATION_COUNT_CAP", 1000)
+REST_ASYNC_TRUSTED_OUTPUT = getattr(settings, "REST_ASYNC_TRUSTED_OUTPUT", False)
+REST_ASYNC_OUTPUT_SAMPLE_RATE = getattr(settings, "REST_ASYNC_OUTPUT_SAMPLE_RATE", 0.0)
+REST_ASYNC_JSON_CODEC = getattr(settings, "REST_ASYNC_JSON_CODEC", "stdlib")
+REST_ASYNC_SIGNAL_DISPATCH = getattr(settings, "REST_ASYNC_SIGNAL_DISPATCH", "inline")
+REST_ASYNC_SIGNAL_BACKGROUND_LIMIT = getattr(settings, "REST_ASYNC_SIGNAL_BACKGROUND_LIMIT", 100)
+REST_ASYNC_QUERY_CACHE = getattr(settings, "REST_ASYNC_QUERY_CACHE", "local")
+REST_ASYNC_QUERY_CACHE_SIZE = getattr(settings, "REST_ASYNC_QUERY_CACHE_SIZE", 1024)
+REST_ASYNC_QUERY_CACHE_TTL = getattr(settings, "REST_ASYNC_QUERY_CACHE_TTL", 60)
+REST_ASYNC_QUERY_COALESCE = getattr(settings, "REST_ASYNC_QUERY_COALESCE", False)
+REST_ASYNC_SQL_CACHE_SIZE = getattr(settings, "REST_ASYNC_SQL_CACHE_SIZE", 512)
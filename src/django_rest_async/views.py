@@ -1,7 +1,10 @@
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse
 from django.urls import URLPattern, URLResolver
 
+from django_rest_async.rest.metadata import get_validator_metadata
+from django_rest_async.rest.response import Response
+
 urlconf = __import__(settings.ROOT_URLCONF, {}, {}, [""])
 
 
@@ -95,7 +98,7 @@ async def api_doc_scheme(request):
             content = {}
             parameters = []
             if hasattr(url_pattern.callback, "params_validator_cls"):
-                schema = url_pattern.callback.params_validator_cls.schema()
+                schema = get_validator_metadata(url_pattern.callback.params_validator_cls)["schema"]
                 for parameter, value in schema.get("properties", {}).items():
                     parameters.append(
                         {
@@ -117,7 +120,7 @@ async def api_doc_scheme(request):
                 )
             content["parameters"] = parameters
             if hasattr(url_pattern.callback, "request_validator_cls"):
-                schema = url_pattern.callback.request_validator_cls.schema()
+                schema = get_validator_metadata(url_pattern.callback.request_validator_cls)["schema"]
                 content["requestBody"] = {
                     "content": {
                         "application/json": {
@@ -127,7 +130,7 @@ async def api_doc_scheme(request):
                 }
                 definitions.update(schema.get("definitions", {}))
             if hasattr(url_pattern.callback, "response_validator_cls"):
-                schema = url_pattern.callback.response_validator_cls.schema()
+                schema = get_validator_metadata(url_pattern.callback.response_validator_cls)["schema"]
                 content["responses"] = {
                     "200": {
                         "description": "Ok",
@@ -174,4 +177,4 @@ async def api_doc_scheme(request):
             },
         },
     }
-    return JsonResponse(openapi)
+    return Response(openapi)
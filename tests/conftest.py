@@ -1,3 +1,7 @@
+import asyncio
+
+import pytest
+
 import django
 
 
@@ -43,3 +47,31 @@ def pytest_configure(config):
     )
 
     django.setup()
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    from django.db.backends.utils import CursorWrapper
+
+    executed = []
+    execute = CursorWrapper.execute
+
+    def counting_execute(self, sql, params=None):
+        executed.append(sql)
+        return execute(self, sql, params)
+
+    monkeypatch.setattr(CursorWrapper, "execute", counting_execute)
+    return executed
+
+
+@pytest.fixture
+def hops(monkeypatch):
+    calls = []
+    run_in_executor = asyncio.BaseEventLoop.run_in_executor
+
+    def counting_run_in_executor(self, executor, fn, *args):
+        calls.append(fn)
+        return run_in_executor(self, executor, fn, *args)
+
+    monkeypatch.setattr(asyncio.BaseEventLoop, "run_in_executor", counting_run_in_executor)
+    return calls
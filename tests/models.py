@@ -25,3 +25,7 @@ class ManyToOneModel(BaseAsyncModel):
 
 class OneToOneModel(BaseAsyncModel):
     field = models.ForeignKey(BasicModel, on_delete=models.CASCADE)
+
+
+class DateTimeModel(BaseAsyncModel):
+    at = models.DateTimeField()
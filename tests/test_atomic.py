@@ -0,0 +1,84 @@
+import pytest
+
+from django.db import IntegrityError
+
+from django_rest_async.db.atomic import async_atomic
+from django_rest_async.db.cache import get_table_versions
+
+from .models import BasicModel, ManyToManyModel, ManyToOneModel
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_atomic_queued_writes(hops):
+    async with async_atomic() as atomic:
+        model = atomic.create(BasicModel, field="basic")
+        atomic.create(ManyToOneModel, field=model)
+        m2m_model = atomic.create(ManyToManyModel)
+        atomic.add(m2m_model, "field", model)
+        updated = atomic.update(BasicModel.async_objects.filter(field="basic"), field="updated")
+        assert model.pk is None
+
+    # the writes and the commit run in one hop
+    assert len(hops) == 1
+    assert await updated == 1
+    assert (await BasicModel.async_objects.get(pk=model.pk)).field == "updated"
+    assert await ManyToOneModel.async_objects.filter(field=model).exists()
+    assert [m.pk for m in await model.async_manytomanymodel_set.all().query()] == [m2m_model.pk]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_atomic_flush_on_result():
+    async with async_atomic() as atomic:
+        atomic.create(BasicModel, field="a")
+        atomic.create(BasicModel, field="b")
+        # a read in the block runs the queued writes first
+        assert await BasicModel.async_objects.count() == 2
+        deleted = atomic.delete(BasicModel.async_objects.filter(field="a"))
+        assert (await deleted)[0] == 1
+        assert await BasicModel.async_objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_atomic_rollback():
+    with pytest.raises(ValueError):
+        async with async_atomic() as atomic:
+            atomic.create(BasicModel, field="a")
+            assert await BasicModel.async_objects.count() == 1
+            raise ValueError()
+
+    with pytest.raises(IntegrityError):
+        async with async_atomic() as atomic:
+            atomic.create(BasicModel, field="b")
+            atomic.create(ManyToOneModel, field_id=0)
+
+    assert await BasicModel.async_objects.count() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_atomic_savepoint():
+    async with async_atomic() as atomic:
+        atomic.create(BasicModel, field="outer")
+        with pytest.raises(ValueError):
+            async with async_atomic() as inner:
+                inner.create(BasicModel, field="inner")
+                assert await BasicModel.async_objects.count() == 2
+                raise ValueError()
+        assert await BasicModel.async_objects.count() == 1
+
+    assert [m.field for m in await BasicModel.async_objects.all().query()] == ["outer"]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_atomic_bumps_versions_after_commit():
+    tables = [BasicModel._meta.db_table]
+    async with async_atomic():
+        await BasicModel.async_objects.create(field="a")
+        # a read of the old rows cached now is keyed by these versions
+        versions = get_table_versions(tables)
+
+    assert get_table_versions(tables) != versions
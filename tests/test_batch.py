@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from django_rest_async.db import executor
+from django_rest_async.db.batch import async_batch
+from django_rest_async.db.executor import shutdown_executors
+from django_rest_async.db.queryset import QueryCall
+
+from .models import BasicModel, ManyToOneModel
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_batch_one_hop(hops):
+    model = await BasicModel.async_objects.create(field="a")
+    await BasicModel.async_objects.create(field="b")
+    await ManyToOneModel.async_objects.create(field=model)
+
+    assert await asyncio.create_task(BasicModel.async_objects.count()) == 2
+    count = BasicModel.async_objects.lazy().count()
+    assert isinstance(count, QueryCall)
+    assert await count == 2
+    with pytest.raises(AttributeError):
+        BasicModel.async_objects.lazy().delete()
+
+    hops.clear()
+    results = await async_batch(
+        BasicModel.async_objects.lazy().count(),
+        ManyToOneModel.async_objects.filter(field=model).lazy().exists(),
+        BasicModel.async_objects.order_by("pk").lazy().first(),
+        BasicModel.async_objects.order_by("pk").lazy().values_list("field", flat=True),
+        BasicModel.async_objects.filter(field="c").lazy().exists(),
+    )
+    assert len(hops) == 1
+    assert results[0] == 2
+    assert results[1] is True
+    assert results[2].pk == model.pk
+    assert results[3] == ["a", "b"]
+    assert results[4] is False
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_batch_errors():
+    await BasicModel.async_objects.create(field="a")
+
+    with pytest.raises(TypeError):
+        await async_batch(BasicModel.async_objects.count())
+
+    with pytest.raises(BasicModel.DoesNotExist):
+        await async_batch(BasicModel.async_objects.lazy().count(), BasicModel.async_objects.lazy().get(field="b"))
+
+    count, error = await async_batch(
+        BasicModel.async_objects.lazy().count(), BasicModel.async_objects.lazy().get(field="b"), return_exceptions=True
+    )
+    assert count == 1
+    assert isinstance(error, BasicModel.DoesNotExist)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_batch_concurrent(monkeypatch, hops):
+    monkeypatch.setattr(executor, "REST_ASYNC_DB_EXECUTOR", {"default": 2})
+    try:
+        await BasicModel.async_objects.create(field="a")
+        hops.clear()
+        results = await async_batch(
+            *[BasicModel.async_objects.filter(field=field).lazy().exists() for field in "abc"], concurrent=True
+        )
+        assert results == [True, False, False]
+        assert len(hops) == 2
+    finally:
+        shutdown_executors()
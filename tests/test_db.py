@@ -1,6 +1,22 @@
+import asyncio
+from datetime import timedelta
+
 import pytest
 
-from .models import BasicModel, ManyToManyModel, ManyToOneModel
+from django.contrib.auth.models import User
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db import IntegrityError
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from django_rest_async.db import cache, pagination, queryset
+from django_rest_async.db.batch import async_batch
+from django_rest_async.db.executor import run_in_db_executor
+from django_rest_async.db.flight import single_flight
+from django_rest_async.db.models import AsyncManyRelatedDescriptor, AsyncModel, AsyncRelatedObjectDescriptor
+from django_rest_async.db.pagination import InvalidCursorError, get_cursor_ordering
+
+from .models import BasicModel, DateTimeModel, ManyToManyModel, ManyToOneModel, OneToOneModel
 
 
 @pytest.mark.django_db(transaction=True)
@@ -214,3 +230,477 @@ async def test_db_m2m():
     await m2m_model.async_field.remove(model)
     rel_models = await m2m_model.async_field.all().query()
     assert len(rel_models) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_m2m_set_atomic():
+    models = [await BasicModel.async_objects.create(field=str(i)) for i in range(2)]
+    m2m_model = await ManyToManyModel.async_objects.create()
+    await m2m_model.async_field.add(models[0])
+
+    # the missing target fails the add: the remove of the same set() is rolled back
+    with pytest.raises(IntegrityError):
+        await m2m_model.async_field.set([models[1].pk, models[1].pk + 1000])
+    assert [model.pk for model in await m2m_model.async_field.all().query()] == [models[0].pk]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_m2m_bulk(queries):
+    models = [await BasicModel.async_objects.create(field=str(i)) for i in range(3)]
+    m2m_models = [await ManyToManyModel.async_objects.create() for _ in range(3)]
+    await m2m_models[0].async_field.add(models[0], models[1])
+    await m2m_models[1].async_field.add(models[0])
+
+    async def targets():
+        return {
+            m2m_model.pk: sorted(m.pk for m in await m2m_model.async_field.all().query()) for m2m_model in m2m_models
+        }
+
+    queries.clear()
+    result = await ManyToManyModel.async_objects.m2m_bulk_set(
+        "field",
+        {
+            m2m_models[0].pk: [models[1].pk, models[2].pk],
+            m2m_models[1].pk: [],
+            m2m_models[2].pk: [models[0].pk, models[2].pk],
+        },
+    )
+    assert result == {"added": 3, "removed": 2}
+    # the diff query, then one delete and one insert (each in its transaction)
+    assert [sql.split()[0] for sql in queries if sql != "BEGIN"] == ["SELECT", "DELETE", "INSERT"]
+    assert await targets() == {
+        m2m_models[0].pk: [models[1].pk, models[2].pk],
+        m2m_models[1].pk: [],
+        m2m_models[2].pk: [models[0].pk, models[2].pk],
+    }
+
+    result = await ManyToManyModel.async_objects.m2m_bulk_add(
+        "field", {m2m_models[0].pk: [models[0].pk, models[1].pk], m2m_models[1].pk: [models[1].pk]}
+    )
+    assert result == {"added": 2, "removed": 0}
+    result = await ManyToManyModel.async_objects.m2m_bulk_remove(
+        "field", {m2m_models[0].pk: [models[2].pk], m2m_models[2].pk: [models[1].pk]}
+    )
+    assert result == {"added": 0, "removed": 1}
+    assert await targets() == {
+        m2m_models[0].pk: [models[0].pk, models[1].pk],
+        m2m_models[1].pk: [models[1].pk],
+        m2m_models[2].pk: [models[0].pk, models[2].pk],
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_m2o_cached(queries):
+    model = await BasicModel.async_objects.create(field="test")
+    m2o_model = await ManyToOneModel.async_objects.get(pk=(await ManyToOneModel.async_objects.create(field=model)).pk)
+
+    queries.clear()
+    assert (await m2o_model.async_field).pk == model.pk
+    assert (await m2o_model.async_field).pk == model.pk
+    assert len(queries) == 1
+
+    m2o_model = await ManyToOneModel.async_objects.select_related("field").get(pk=m2o_model.pk)
+    queries.clear()
+    assert (await m2o_model.async_field).pk == model.pk
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_reverse_relations(queries):
+    model = await BasicModel.async_objects.create(field="test")
+    other_model = await BasicModel.async_objects.create(field="other")
+    await model.async_manytoonemodel_set.create()
+    await ManyToOneModel.async_objects.create(field=other_model)
+    m2m_model = await ManyToManyModel.async_objects.create()
+    await m2m_model.async_field.add(model)
+
+    assert await model.async_manytoonemodel_set.count() == 1
+    assert await model.async_manytoonemodel_set.filter(pk__gt=0).exists()
+    assert [m.pk for m in await model.async_manytomanymodel_set.all().query()] == [m2m_model.pk]
+    with pytest.raises(AttributeError):
+        model.async_unknown_set
+
+    model = await BasicModel.async_objects.prefetch_related("manytoonemodel_set", "manytomanymodel_set").get(
+        pk=model.pk
+    )
+    queries.clear()
+    assert len(await model.async_manytoonemodel_set.all().query()) == 1
+    assert await model.async_manytoonemodel_set.count() == 1
+    assert [m.pk async for m in model.async_manytomanymodel_set.all()] == [m2m_model.pk]
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_chain_is_immutable():
+    await BasicModel.async_objects.create(field="a")
+    await BasicModel.async_objects.create(field="b")
+
+    base = BasicModel.async_objects.all()
+    only_a = base.filter(field="a")
+    not_a = base.exclude(field="a")
+
+    assert await base.count() == 2
+    assert await only_a.count() == 1
+    assert await not_a.count() == 1
+    assert await only_a.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_concurrent_chains_do_not_leak():
+    fields = [f"field_{i}" for i in range(10)]
+    for i, field in enumerate(fields):
+        for _ in range(i + 1):
+            await BasicModel.async_objects.create(field=field)
+
+    async def count(i):
+        field = fields[i % len(fields)]
+        qs = BasicModel.async_objects.all()
+        await asyncio.sleep(0)
+        qs = qs.filter(field__startswith="field_")
+        await asyncio.sleep(0)
+        qs = qs.filter(field=field)
+        await asyncio.sleep(0)
+        return field, await qs.order_by("pk").count()
+
+    results = await asyncio.gather(*[count(i) for i in range(300)])
+    for field, result in results:
+        assert result == fields.index(field) + 1
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_aiter():
+    models = [await BasicModel.async_objects.create(field=f"field_{i}") for i in range(5)]
+
+    objs = [obj async for obj in BasicModel.async_objects.filter(field__startswith="field_").order_by("pk")]
+    assert [obj.pk for obj in objs] == [model.pk for model in models]
+
+    objs = [obj async for obj in BasicModel.async_objects.all().order_by("-pk").aiterator(chunk_size=2)]
+    assert [obj.pk for obj in objs] == [model.pk for model in reversed(models)]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_avalues_iter():
+    models = [await BasicModel.async_objects.create(field=f"field_{i}") for i in range(5)]
+
+    values = [value async for value in BasicModel.async_objects.all().order_by("pk").avalues_iter("pk", chunk_size=2)]
+    assert values == [{"pk": model.pk} for model in models]
+
+    values_list = [
+        value async for value in BasicModel.async_objects.all().order_by("pk").avalues_list_iter("field", flat=True)
+    ]
+    assert values_list == [model.field for model in models]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_aiter_break():
+    for i in range(5):
+        await BasicModel.async_objects.create(field=f"field_{i}")
+
+    iterator = BasicModel.async_objects.all().aiterator(chunk_size=2)
+    async for obj in iterator:
+        break
+    await iterator.aclose()
+
+    assert await BasicModel.async_objects.all().count() == 5
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_cursor_pagination_query():
+    models = [await BasicModel.async_objects.create(field=f"field_{i % 3}") for i in range(7)]
+    expected = sorted(models, key=lambda model: (model.field, -model.pk), reverse=True)
+    qs = BasicModel.async_objects.all()
+
+    pages = []
+    cursor = None
+    while True:
+        page = await qs.cursor_pagination_query(order_by=["-field", "pk"], limit=3, cursor=cursor)
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [len(page["results"]) for page in pages] == [3, 3, 1]
+    assert [obj.pk for page in pages for obj in page["results"]] == [model.pk for model in expected]
+    assert pages[0]["prev_cursor"] is None
+
+    page = await qs.cursor_pagination_query(order_by=["-field", "pk"], limit=3, cursor=pages[2]["prev_cursor"])
+    assert [obj.pk for obj in page["results"]] == [obj.pk for obj in pages[1]["results"]]
+    page = await qs.cursor_pagination_query(order_by=["-field", "pk"], limit=3, cursor=page["prev_cursor"])
+    assert [obj.pk for obj in page["results"]] == [obj.pk for obj in pages[0]["results"]]
+    assert page["prev_cursor"] is None
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_cursor_pagination_query_invalid_cursor():
+    with pytest.raises(InvalidCursorError):
+        await BasicModel.async_objects.all().cursor_pagination_query(order_by=["pk"], limit=3, cursor="invalid")
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_cursor_pagination_query_datetime():
+    now = timezone.now().replace(microsecond=0)
+    models = [await DateTimeModel.async_objects.create(at=now + timedelta(microseconds=100 * i)) for i in range(4)]
+    qs = DateTimeModel.async_objects.all()
+
+    first = await qs.cursor_pagination_query(order_by=["at"], limit=2)
+    second = await qs.cursor_pagination_query(order_by=["at"], limit=2, cursor=first["next_cursor"])
+    assert [obj.pk for obj in first["results"] + second["results"]] == [model.pk for model in models]
+    assert second["next_cursor"] is None
+
+    page = await qs.cursor_pagination_query(order_by=["at"], limit=2, cursor=second["prev_cursor"])
+    assert [obj.pk for obj in page["results"]] == [obj.pk for obj in first["results"]]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_cursor_pagination_query_ordering():
+    for i in range(3):
+        await BasicModel.async_objects.create(field=f"field_{i}")
+    qs = BasicModel.async_objects.all()
+
+    page = await qs.cursor_pagination_query(order_by=["-field"], limit=2)
+    with pytest.raises(InvalidCursorError):
+        await qs.cursor_pagination_query(order_by=["field"], limit=2, cursor=page["next_cursor"])
+
+    with pytest.raises(InvalidCursorError):
+        get_cursor_ordering(User, ["last_login"])
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_pagination_query_total():
+    for i in range(3):
+        await BasicModel.async_objects.create(field=f"field_{i}")
+    qs = BasicModel.async_objects.all()
+
+    page = await qs.pagination_query(order_by=["pk"], limit=2)
+    assert (page["total"], page["total_exact"]) == (3, True)
+    assert len(page["results"]) == 2
+
+    page = await qs.pagination_query(order_by=["pk"], limit=2, total="none")
+    assert (page["total"], page["total_exact"]) == (None, False)
+
+    page = await qs.pagination_query(order_by=["pk"], limit=2, total="estimated")
+    assert (page["total"], page["total_exact"]) == (3, True)
+
+    with pytest.raises(ValueError):
+        await qs.pagination_query(order_by=["pk"], limit=2, total="unknown")
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_pagination_query_total_capped(monkeypatch):
+    monkeypatch.setattr(pagination, "REST_ASYNC_PAGINATION_COUNT_CAP", 2)
+    for i in range(3):
+        await BasicModel.async_objects.create(field=f"field_{i}")
+
+    page = await BasicModel.async_objects.all().pagination_query(order_by=["pk"], limit=2, total="estimated")
+    assert (page["total"], page["total_exact"]) == (2, False)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_pagination_query_total_cached():
+    await BasicModel.async_objects.create(field="test")
+    qs = BasicModel.async_objects.filter(field="test")
+
+    assert (await qs.pagination_query(limit=2, total="cached"))["total"] == 1
+    # writes that bypass the async api do not invalidate the cached total
+    await run_in_db_executor("default", BasicModel.objects.create, field="test")
+    assert (await qs.pagination_query(limit=2, total="cached"))["total"] == 1
+
+    await BasicModel(field="test").async_save()
+    assert (await qs.pagination_query(limit=2, total="cached"))["total"] == 3
+
+    await qs.update(field="other")
+    assert (await qs.pagination_query(limit=2, total="cached"))["total"] == 0
+
+
+@pytest.fixture
+def query_cache(monkeypatch):
+    monkeypatch.setattr(cache, "_query_caches", {})
+    return cache.get_query_cache
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_query_cache(query_cache, queries):
+    model = await BasicModel.async_objects.create(field="test")
+    m2m_model = await ManyToManyModel.async_objects.create()
+    qs = BasicModel.async_objects.filter(field="test").cache(ttl=60)
+    m2m_qs = ManyToManyModel.async_objects.filter(field__field="test").cache()
+
+    queries.clear()
+    for _ in range(2):
+        assert await qs.count() == 1
+        assert await qs.values_list("pk", flat=True) == [model.pk]
+        assert not await m2m_qs.exists()
+        assert (await qs.first()).pk == model.pk
+    assert len(queries) == 4
+
+    # a cached instance is a copy
+    (await qs.first()).field = "changed"
+    assert (await qs.first()).field == "test"
+
+    # writes that bypass the async api do not invalidate the cache
+    await run_in_db_executor("default", BasicModel.objects.create, field="test")
+    assert await qs.count() == 1
+
+    await BasicModel(field="test").async_save()
+    assert await qs.count() == 3
+    await m2m_model.async_field.add(model)
+    assert await m2m_qs.exists()
+    await model.async_delete()
+    assert await qs.count() == 2
+    assert not await m2m_qs.exists()
+
+    queries.clear()
+    assert await BasicModel.async_objects.filter(field="test").count() == 2
+    assert await qs.filter(field="other").count() == 0
+    assert await qs.prefetch_related("manytomanymodel_set").count() == 2
+    assert (await async_batch(qs.lazy().count(), qs.filter(field="other").lazy().count())) == [2, 0]
+    assert len(queries) == 3
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_query_cache_subqueries(query_cache):
+    model = await BasicModel.async_objects.create(field="test")
+    qs = BasicModel.async_objects.filter(pk__in=ManyToOneModel.objects.values("field_id")).cache()
+    exists_qs = BasicModel.async_objects.filter(Exists(ManyToOneModel.objects.filter(field_id=OuterRef("pk")))).cache()
+
+    assert await qs.count() == 0
+    assert await exists_qs.count() == 0
+    await ManyToOneModel.async_objects.create(field=model)
+    assert await qs.count() == 1
+    assert await exists_qs.count() == 1
+
+    assert cache.get_query_tables(
+        BasicModel.objects.filter(pk__in=ManyToOneModel.objects.values("field_id")).query
+    ) == {
+        "tests_basicmodel",
+        "tests_manytoonemodel",
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_query_cache_django_backend(query_cache, monkeypatch, queries):
+    monkeypatch.setattr(cache, "REST_ASYNC_QUERY_CACHE", "default")
+    assert isinstance(query_cache(), cache.DjangoCache)
+    await BasicModel.async_objects.create(field="test")
+    qs = BasicModel.async_objects.cache(key="all")
+
+    queries.clear()
+    assert len(await qs.query()) == 1
+    assert len(await qs.query()) == 1
+    assert len(queries) == 1
+
+    await BasicModel.async_objects.create(field="other")
+    assert len(await qs.query()) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_query_cache_sync_only_compile(query_cache, monkeypatch, queries):
+    from django_rest_async.db import compiler
+
+    def compile_query(query, using):
+        raise SynchronousOnlyOperation("You cannot call this from an async context")
+
+    await BasicModel.async_objects.create(field="test")
+    monkeypatch.setattr(compiler, "compile_query", compile_query)
+    qs = BasicModel.async_objects.cache()
+
+    queries.clear()
+    assert await qs.count() == 1
+    assert await qs.count() == 1
+    assert len(queries) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_query_cache_django_backend_shared_versions(query_cache, monkeypatch, queries):
+    monkeypatch.setattr(cache, "REST_ASYNC_QUERY_CACHE", "default")
+    query_cache().clear()
+    await BasicModel.async_objects.create(field="test")
+    qs = BasicModel.async_objects.cache(key="all")
+    table = BasicModel._meta.db_table
+
+    queries.clear()
+    assert len(await qs.query()) == 1
+    versions = cache.get_table_versions({table})
+
+    # a write of another process sharing the backend, the local versions are not touched
+    local_versions = dict(cache._table_versions)
+    other = cache.DjangoCache("default")
+    other.bump_versions([table])
+    assert cache._table_versions == local_versions
+    assert cache.get_table_versions({table}) != versions
+    assert len(await qs.query()) == 1
+    assert len(queries) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_db_query_coalesce(monkeypatch, queries):
+    await BasicModel.async_objects.create(field="test")
+    qs = BasicModel.async_objects.filter(field="test")
+
+    queries.clear()
+    results = await asyncio.gather(*[qs.coalesce().query() for _ in range(5)], qs.coalesce().count())
+    # the identical queries share one, the count is another one
+    assert len(queries) == 2
+    assert len({id(result[0]) for result in results[:5]}) == 5
+    assert results[5] == 1
+
+    queries.clear()
+    await asyncio.gather(*[qs.query() for _ in range(3)])
+    assert len(queries) == 3
+
+    monkeypatch.setattr(queryset, "REST_ASYNC_QUERY_COALESCE", True)
+    queries.clear()
+    await asyncio.gather(*[qs.query() for _ in range(3)], *[qs.coalesce(False).query() for _ in range(2)])
+    assert len(queries) == 3
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    event = asyncio.Event()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await event.wait()
+        return "result"
+
+    first = asyncio.ensure_future(single_flight("key", fn))
+    second = asyncio.ensure_future(single_flight("key", fn))
+    other = asyncio.ensure_future(single_flight("other", fn))
+    await asyncio.sleep(0)
+    # a cancelled caller does not cancel the call
+    first.cancel()
+    event.set()
+    assert await second == ("result", False)
+    assert await other == ("result", True)
+    assert len(calls) == 2
+    assert await single_flight("key", fn) == ("result", True)
+
+
+def test_async_relation_descriptors():
+    assert isinstance(ManyToOneModel.__dict__["async_field"], AsyncRelatedObjectDescriptor)
+    assert isinstance(OneToOneModel.__dict__["async_field"], AsyncRelatedObjectDescriptor)
+    assert isinstance(ManyToManyModel.__dict__["async_field"], AsyncManyRelatedDescriptor)
+    assert "__getattribute__" not in AsyncModel.__dict__
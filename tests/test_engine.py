@@ -0,0 +1,207 @@
+import asyncio
+
+import pytest
+
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Value
+
+from django_rest_async.db import compiler, engine
+from django_rest_async.db.queryset import AsyncBaseQuerySet
+
+from .models import BasicModel, ManyToOneModel
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def native_engine(monkeypatch):
+    async def no_sync_hop(*args, **kwargs):
+        raise AssertionError("sync path is used")
+
+    monkeypatch.setattr(engine, "REST_ASYNC_DB_ENGINE", "native")
+    monkeypatch.setattr(engine, "_engines", {})
+    monkeypatch.setattr(AsyncBaseQuerySet, "_execute_sync", no_sync_hop)
+
+
+async def _create(*fields):
+    return [await BasicModel.async_objects.create(field=field) for field in fields]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_query(native_engine):
+    a, b = await _create("a", "b")
+
+    objs = await BasicModel.async_objects.filter(field__in=["a", "b"]).order_by("-pk").query()
+    assert [obj.pk for obj in objs] == [b.pk, a.pk]
+    assert isinstance(objs[0], BasicModel)
+    assert objs[0]._state.adding is False
+    assert await BasicModel.async_objects.filter(pk__in=[]).query() == []
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_get_first_last(native_engine):
+    a, b = await _create("a", "b")
+
+    assert (await BasicModel.async_objects.get(field="a")).pk == a.pk
+    assert (await BasicModel.async_objects.all().first()).pk == a.pk
+    assert (await BasicModel.async_objects.all().last()).pk == b.pk
+    assert await BasicModel.async_objects.filter(field="c").first() is None
+
+    with pytest.raises(BasicModel.DoesNotExist):
+        await BasicModel.async_objects.get(field="c")
+    with pytest.raises(BasicModel.MultipleObjectsReturned):
+        await BasicModel.async_objects.all().get()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_count_exists(native_engine):
+    await _create("a", "b", "b")
+
+    assert await BasicModel.async_objects.all().count() == 3
+    assert await BasicModel.async_objects.filter(field="b").count() == 2
+    assert await BasicModel.async_objects.filter(field="a").exists()
+    assert not await BasicModel.async_objects.filter(field="c").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_values(native_engine):
+    a, b = await _create("a", "b")
+
+    values = await BasicModel.async_objects.all().order_by("pk").values("pk", "field")
+    assert values == [{"pk": a.pk, "field": "a"}, {"pk": b.pk, "field": "b"}]
+    values_list = await BasicModel.async_objects.all().order_by("pk").values_list("field", flat=True)
+    assert values_list == ["a", "b"]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_pagination_query(native_engine):
+    objs = await _create("a", "b", "c")
+
+    page = await BasicModel.async_objects.all().pagination_query(order_by=["-pk"], limit=2, offset=1)
+    assert page["total"] == 3
+    assert [obj.pk for obj in page["results"]] == [objs[1].pk, objs[0].pk]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_falls_back_to_sync_path(monkeypatch):
+    monkeypatch.setattr(engine, "REST_ASYNC_DB_ENGINE", "native")
+    monkeypatch.setattr(engine, "_engines", {})
+    a, b = await _create("a", "b")
+
+    objs = await BasicModel.async_objects.all().prefetch_related("manytomanymodel_set").query()
+    assert len(objs) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_concurrency(native_engine):
+    await _create(*[f"field_{i}" for i in range(10)])
+
+    async def fetch(i):
+        return i, await BasicModel.async_objects.filter(field=f"field_{i % 10}").query()
+
+    for i, objs in await asyncio.gather(*[fetch(i) for i in range(200)]):
+        assert [obj.field for obj in objs] == [f"field_{i % 10}"]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_aiter(native_engine):
+    objs = await _create(*[f"field_{i}" for i in range(5)])
+
+    result = [obj async for obj in BasicModel.async_objects.all().order_by("pk").aiterator(chunk_size=2)]
+    assert [obj.pk for obj in result] == [obj.pk for obj in objs]
+    values = [value async for value in BasicModel.async_objects.all().order_by("pk").avalues_iter("field")]
+    assert values == [{"field": obj.field} for obj in objs]
+    values_list = [value async for value in BasicModel.async_objects.all().order_by("pk").avalues_list_iter("pk")]
+    assert values_list == [(obj.pk,) for obj in objs]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_cursor_pagination_query(native_engine):
+    objs = await _create("a", "b", "c")
+
+    page = await BasicModel.async_objects.all().cursor_pagination_query(order_by=["-pk"], limit=2)
+    assert [obj.pk for obj in page["results"]] == [objs[2].pk, objs[1].pk]
+    page = await BasicModel.async_objects.all().cursor_pagination_query(
+        order_by=["-pk"], limit=2, cursor=page["next_cursor"]
+    )
+    assert [obj.pk for obj in page["results"]] == [objs[0].pk]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_pagination_query_total(native_engine):
+    await _create("a", "b", "c")
+    qs = BasicModel.async_objects.all()
+
+    for total in ("exact", "cached", "estimated"):
+        page = await qs.pagination_query(limit=2, total=total)
+        assert (page["total"], page["total_exact"]) == (3, True)
+    page = await qs.pagination_query(limit=2, total="none")
+    assert (page["total"], page["total_exact"]) == (None, False)
+
+
+@pytest.fixture
+def sql_cache():
+    compiler.reset_sql_cache()
+    yield compiler.get_sql_cache_stats
+    compiler.reset_sql_cache()
+
+
+@pytest.mark.django_db
+def test_compile_query_parity(sql_cache):
+    querysets = [
+        lambda value: BasicModel.objects.filter(field=value, pk__gt=len(value)).order_by("-pk")[:10],
+        lambda value: BasicModel.objects.filter(field__in=[value, value * 2]).values("field"),
+        lambda value: BasicModel.objects.filter(field__contains=value).only("pk"),
+        lambda value: ManyToOneModel.objects.filter(field__field=value).select_related("field"),
+        lambda value: BasicModel.objects.exclude(field=value).filter(manytomanymodel__isnull=False).distinct(),
+        lambda value: BasicModel.objects.annotate(label=Value(value)).filter(field=value),
+        lambda value: BasicModel.objects.filter(field=value, pk__in=[]),
+        lambda value: BasicModel.objects.all(),
+    ]
+    for build in querysets:
+        for value in ("a", "bb", "a"):
+            query = build(value).query
+            try:
+                expected = query.chain().get_compiler("default").as_sql()
+            except EmptyResultSet:
+                with pytest.raises(EmptyResultSet):
+                    compiler.compile_query(query, "default")
+                continue
+            _, sql, params = compiler.compile_query(query, "default")
+            assert (sql, tuple(params)) == (expected[0], tuple(expected[1]))
+
+    # the parameter of the annotation is outside of the where clause: its shapes are compiled every time
+    assert sql_cache() == {"hits": 12, "misses": 8, "uncacheable": 1}
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_sql_cache(native_engine, sql_cache):
+    objs = await _create("a", "b", "c")
+
+    for obj in objs:
+        assert (await BasicModel.async_objects.filter(field=obj.field).first()).pk == obj.pk
+        assert await BasicModel.async_objects.filter(pk__gte=obj.pk).count() == 3 - objs.index(obj)
+    assert sql_cache() == {"hits": 4, "misses": 2, "uncacheable": 0}
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_engine_sqlite_functions(native_engine):
+    if engine.register_sqlite_functions is None:
+        pytest.skip("django < 4.1 does not expose the sqlite functions")
+    await _create("a", "ab", "b")
+
+    assert await BasicModel.async_objects.filter(field__regex="^a").count() == 2
+    assert await BasicModel.async_objects.filter(field__iregex="B$").values_list("field", flat=True) == ["ab", "b"]
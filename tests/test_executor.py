@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from django.db import connection, transaction
+
+from django_rest_async.db import executor
+from django_rest_async.db.executor import pin_connection, run_in_db_executor, shutdown_executors
+
+from .models import BasicModel
+
+
+@pytest.fixture
+def db_executor(monkeypatch):
+    monkeypatch.setattr(executor, "REST_ASYNC_DB_EXECUTOR", {"default": 4})
+    yield
+    shutdown_executors()
+
+
+def _thread_name():
+    time.sleep(0.01)
+    return threading.current_thread().name
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_executor_runs_calls_concurrently(db_executor):
+    names = await asyncio.gather(*[run_in_db_executor("default", _thread_name) for _ in range(16)])
+
+    assert 1 < len(set(names)) <= 4
+    assert all(name.startswith("django-rest-async-default") for name in names)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_executor_queries(db_executor):
+    for i in range(20):
+        await BasicModel.async_objects.create(field=f"field_{i}")
+
+    counts = await asyncio.gather(*[BasicModel.async_objects.filter(field=f"field_{i}").count() for i in range(20)])
+    assert counts == [1] * 20
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_executor_pin_connection(db_executor):
+    async with pin_connection("default"):
+        names = await asyncio.gather(*[run_in_db_executor("default", _thread_name) for _ in range(4)])
+        assert len(set(names)) == 1
+        assert "pinned" in names[0]
+
+        atomic = transaction.atomic(using="default")
+        await run_in_db_executor("default", atomic.__enter__)
+        await BasicModel.async_objects.create(field="test")
+        assert await run_in_db_executor("default", lambda: connection.in_atomic_block)
+        await run_in_db_executor("default", transaction.set_rollback, True)
+        await run_in_db_executor("default", atomic.__exit__, None, None, None)
+
+    assert not await BasicModel.async_objects.filter(field="test").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_executor_pin_connection_reuses_thread(db_executor):
+    async with pin_connection("default"):
+        first = await run_in_db_executor("default", threading.current_thread)
+    async with pin_connection("default"):
+        assert await run_in_db_executor("default", threading.current_thread) is first
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_executor_pin_connection_bounded(db_executor, monkeypatch):
+    monkeypatch.setattr(executor, "REST_ASYNC_DEDICATED_THREADS", 1)
+    events = []
+
+    async def block(name):
+        async with pin_connection("default"):
+            events.append((name, await run_in_db_executor("default", threading.current_thread)))
+            await asyncio.sleep(0.01)
+            events.append((name, None))
+
+    await asyncio.gather(block("a"), block("b"))
+    # the second block waits for the thread of the first one
+    assert [name for name, _ in events] == ["a", "a", "b", "b"]
+    assert events[0][1] is events[2][1]
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from django.db import connections
+
+from django_rest_async.db import pool as pool_module
+from django_rest_async.db.engine import SQLiteDriver
+from django_rest_async.db.pool import AsyncConnectionPool, PoolTimeoutError, close_pools, get_pool, get_pool_stats
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def driver(tmp_path):
+    return SQLiteDriver({"database": str(tmp_path / "db.sqlite3")})
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_connections(driver):
+    pool = AsyncConnectionPool(driver, min_size=2, max_size=2)
+
+    async with pool.connection() as conn:
+        assert await driver.fetch(conn, "SELECT %s", [1]) == [(1,)]
+    async with pool.connection() as conn_2:
+        pass
+
+    assert conn_2 is conn
+    stats = pool.stats()
+    assert stats["size"] == 2
+    assert stats["in_use"] == 0
+    assert stats["acquired"] == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_max_size(driver):
+    pool = AsyncConnectionPool(driver, max_size=3)
+    max_in_use = 0
+
+    async def query():
+        nonlocal max_in_use
+        async with pool.connection() as conn:
+            max_in_use = max(max_in_use, pool.in_use)
+            await asyncio.sleep(0.001)
+            return await driver.fetch(conn, "SELECT 1", [])
+
+    results = await asyncio.gather(*[query() for _ in range(50)])
+
+    assert results == [[(1,)]] * 50
+    assert max_in_use == 3
+    assert pool.stats()["size"] == 3
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_acquire_timeout(driver):
+    pool = AsyncConnectionPool(driver, max_size=1, acquire_timeout=0.01)
+
+    async with pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            await pool.acquire()
+
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["waiting"] == 0
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_recycles_idle_connections(driver):
+    pool = AsyncConnectionPool(driver, max_size=1, max_idle=0)
+
+    async with pool.connection() as conn:
+        pass
+    await asyncio.sleep(0.001)
+    async with pool.connection() as conn_2:
+        pass
+
+    assert conn_2 is not conn
+    assert pool.stats()["size"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_pre_ping(driver):
+    pool = AsyncConnectionPool(driver, max_size=1, pre_ping=True)
+
+    async with pool.connection() as conn:
+        pass
+    await conn.close()
+    async with pool.connection() as conn_2:
+        assert await driver.fetch(conn_2, "SELECT 1", []) == [(1,)]
+
+    assert conn_2 is not conn
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_pre_ping_timeout(driver, monkeypatch):
+    pool = AsyncConnectionPool(driver, max_size=1, acquire_timeout=0.05, pre_ping=True)
+    async with pool.connection():
+        pass
+
+    async def slow_is_alive(conn):
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(pool, "_is_alive", slow_is_alive)
+    with pytest.raises(PoolTimeoutError):
+        await pool.acquire()
+    assert pool.stats()["size"] == 0
+
+    monkeypatch.undo()
+    async with pool.connection() as conn:
+        assert await driver.fetch(conn, "SELECT 1", []) == [(1,)]
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_discards_broken_connections(driver):
+    pool = AsyncConnectionPool(driver, max_size=1)
+
+    with pytest.raises(ValueError):
+        async with pool.connection():
+            raise ValueError()
+
+    assert pool.stats()["size"] == 0
+    assert pool.stats()["in_use"] == 0
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_from_settings(driver, monkeypatch):
+    monkeypatch.setattr(pool_module, "_pools", {})
+    monkeypatch.setitem(
+        connections["default"].settings_dict, "ASYNC_POOL", {"MIN_SIZE": 1, "MAX_SIZE": 4, "PRE_PING": True}
+    )
+
+    pool = get_pool("default", driver)
+    async with pool.connection():
+        pass
+
+    assert get_pool("default", driver) is pool
+    assert pool.max_size == 4
+    assert pool.pre_ping
+    assert get_pool_stats()["default"]["size"] == 1
+    await close_pools()
+    assert get_pool_stats() == {}
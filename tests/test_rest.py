@@ -0,0 +1,506 @@
+import asyncio
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from typing import List
+
+import pytest
+from pydantic import BaseModel as PydanticModel
+
+from django.http import JsonResponse, QueryDict
+from django.test import RequestFactory
+
+from django_rest_async.db.helpers import get_value_from_db_instance
+from django_rest_async.db.loader import use_relation_loader
+from django_rest_async.rest import codecs, core, serializers
+from django_rest_async.rest.cleaners import clean_params
+from django_rest_async.rest.core import clean_request_body, rest_view, serialize_response
+from django_rest_async.rest.helpers import enrich_body
+from django_rest_async.rest.metadata import get_validator_metadata
+from django_rest_async.rest.planner import get_query_plan, get_values_plan
+from django_rest_async.rest.response import Response, StreamingResponse
+
+from .models import BasicModel, ManyToManyModel, ManyToOneModel
+
+
+class BasicValidator(PydanticModel):
+    id: int
+    field: str
+
+
+class ManyToOneValidator(PydanticModel):
+    id: int
+    field: BasicValidator
+
+
+class ManyToManyValidator(PydanticModel):
+    id: int
+    field: List[BasicValidator]
+
+
+class ManyToOneIdValidator(PydanticModel):
+    id: int
+    field_id: int
+
+
+class BasicRelationsValidator(PydanticModel):
+    id: int
+    field: str
+    manytoonemodel_set: List[ManyToOneIdValidator]
+    manytomanymodel_set: List[ManyToManyValidator]
+
+
+async def _content(response):
+    if not response.streaming:
+        # django < 4.2: the stream is read by rest_view
+        return response.content
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_streaming_json(monkeypatch):
+    models = [await BasicModel.async_objects.create(field=f"field_{i}") for i in range(5)]
+    chunks = []
+
+    async def serialize_django_models(instances, validator_cls):
+        chunks.append(len(instances))
+        return await serializers.serialize_django_models(instances, validator_cls)
+
+    monkeypatch.setattr(core, "serialize_django_models", serialize_django_models)
+
+    @rest_view(["GET"])
+    @serialize_response(BasicValidator)
+    async def view(request):
+        return 200, StreamingResponse(BasicModel.async_objects.all().order_by("pk").aiterator(), chunk_size=2)
+
+    response = await view(RequestFactory().get("/"))
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/json"
+    assert json.loads(await _content(response)) == [{"id": model.pk, "field": model.field} for model in models]
+    # one serialization per chunk
+    assert chunks == [2, 2, 1]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_streaming_ndjson():
+    models = [await BasicModel.async_objects.create(field=f"field_{i}") for i in range(3)]
+
+    @rest_view(["GET"])
+    async def view(request):
+        iterator = BasicModel.async_objects.all().order_by("pk").avalues_iter("field")
+        return 200, StreamingResponse(iterator, format="ndjson")
+
+    response = await view(RequestFactory().get("/"))
+
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = (await _content(response)).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [{"field": model.field} for model in models]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_streaming_read():
+    models = [await BasicModel.async_objects.create(field=f"field_{i}") for i in range(3)]
+
+    response = StreamingResponse(BasicModel.async_objects.all().order_by("pk").avalues_iter("field"), status=201)
+    response = await response.read()
+
+    assert not response.streaming
+    assert (response.status_code, response["Content-Type"]) == (201, "application/json")
+    assert json.loads(response.content) == [{"field": model.field} for model in models]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_streaming_empty():
+    @rest_view(["GET"])
+    async def view(request):
+        return 200, StreamingResponse(BasicModel.async_objects.all().aiterator())
+
+    response = await view(RequestFactory().get("/"))
+
+    assert json.loads(await _content(response)) == []
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_cursor_pagination():
+    models = [await BasicModel.async_objects.create(field=f"field_{i}") for i in range(3)]
+
+    @rest_view(["GET"])
+    @serialize_response(BasicValidator)
+    async def view(request):
+        qs = BasicModel.async_objects.all()
+        return 200, await qs.cursor_pagination_query(order_by=["pk"], limit=2, cursor=request.GET.get("cursor"))
+
+    response = await view(RequestFactory().get("/"))
+    data = json.loads(response.content)
+    assert data["results"] == [{"id": model.pk, "field": model.field} for model in models[:2]]
+    assert data["prev_cursor"] is None
+
+    response = await view(RequestFactory().get("/", {"cursor": data["next_cursor"]}))
+    data = json.loads(response.content)
+    assert data["results"] == [{"id": models[2].pk, "field": models[2].field}]
+    assert data["next_cursor"] is None
+
+    response = await view(RequestFactory().get("/", {"cursor": "invalid"}))
+    assert response.status_code == 400
+
+
+def test_rest_query_plan():
+    assert get_query_plan(ManyToOneValidator, ManyToOneModel) == {
+        "select_related": ["field"],
+        "prefetch_related": [],
+        "only": ["id", "field", "field__id", "field__field"],
+    }
+    assert get_query_plan(BasicRelationsValidator, BasicModel) == {
+        "select_related": [],
+        "prefetch_related": ["manytoonemodel_set", "manytomanymodel_set", "manytomanymodel_set__field"],
+        "only": ["id", "field"],
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_query_plan_fk(queries):
+    for i in range(10):
+        await ManyToOneModel.async_objects.create(field=await BasicModel.async_objects.create(field=f"field_{i}"))
+
+    @rest_view(["GET"])
+    @serialize_response(ManyToOneValidator)
+    async def view(request):
+        return 200, ManyToOneModel.async_objects.all().order_by("pk")
+
+    queries.clear()
+    response = await view(RequestFactory().get("/"))
+
+    results = json.loads(response.content)["results"]
+    assert [result["field"]["field"] for result in results] == [f"field_{i}" for i in range(10)]
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_query_plan_m2m_and_reverse(queries):
+    basic = await BasicModel.async_objects.create(field="basic")
+    for i in range(10):
+        model = await BasicModel.async_objects.create(field=f"field_{i}")
+        await ManyToOneModel.async_objects.create(field=model)
+        m2m_model = await ManyToManyModel.async_objects.create()
+        await m2m_model.async_field.add(model, basic)
+
+    @rest_view(["GET"])
+    @serialize_response(BasicRelationsValidator)
+    async def view(request):
+        return 200, {"results": BasicModel.async_objects.filter(field__startswith="field_").order_by("pk")}
+
+    queries.clear()
+    response = await view(RequestFactory().get("/"))
+
+    results = json.loads(response.content)["results"]
+    assert len(results) == 10
+    assert all(len(result["manytoonemodel_set"]) == 1 for result in results)
+    assert all(len(result["manytomanymodel_set"][0]["field"]) == 2 for result in results)
+    assert len(queries) == 4
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_evaluated_results(queries):
+    basic = await BasicModel.async_objects.create(field="basic")
+    for i in range(10):
+        model = await BasicModel.async_objects.create(field=f"field_{i}")
+        await ManyToOneModel.async_objects.create(field=model)
+        m2m_model = await ManyToManyModel.async_objects.create()
+        await m2m_model.async_field.add(model, basic)
+
+    @rest_view(["GET"])
+    @serialize_response(BasicRelationsValidator)
+    async def view(request):
+        # evaluated list, not planned: the missing relations are prefetched by the serializer plan
+        return 200, {
+            "results": await BasicModel.async_objects.filter(field__startswith="field_").order_by("pk").query()
+        }
+
+    queries.clear()
+    response = await view(RequestFactory().get("/"))
+
+    results = json.loads(response.content)["results"]
+    assert len(results) == 10
+    assert all(len(result["manytoonemodel_set"]) == 1 for result in results)
+    assert all(len(result["manytomanymodel_set"][0]["field"]) == 2 for result in results)
+    assert len(queries) == 4
+
+
+def test_rest_serializer_plan():
+    plan = serializers.get_serializer_plan(BasicRelationsValidator, BasicModel)
+    assert plan is serializers.get_serializer_plan(BasicRelationsValidator, BasicModel)
+    assert [field[:2] for field in plan["fields"]] == [
+        ("id", "scalar"),
+        ("field", "scalar"),
+        ("manytoonemodel_set", "many"),
+        ("manytomanymodel_set", "many"),
+    ]
+    assert [field[:2] for field in plan["children"]["manytomanymodel_set"]["fields"]] == [
+        ("id", "scalar"),
+        ("field", "many"),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_serializer_hops(monkeypatch):
+    for i in range(10):
+        await ManyToOneModel.async_objects.create(field=await BasicModel.async_objects.create(field=f"field_{i}"))
+    instances = await ManyToOneModel.async_objects.all().order_by("pk").query()
+
+    hops = []
+    run_in_db_executor = serializers.run_in_db_executor
+
+    async def counting_run_in_db_executor(using, fn, *args, **kwargs):
+        hops.append(fn)
+        return await run_in_db_executor(using, fn, *args, **kwargs)
+
+    monkeypatch.setattr(serializers, "run_in_db_executor", counting_run_in_db_executor)
+    results = await serializers.serialize_django_models(instances, ManyToOneValidator)
+
+    assert [result["field"]["field"] for result in results] == [f"field_{i}" for i in range(10)]
+    # one hop for the page and one for the related level
+    assert len(hops) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_relation_loader(queries, hops):
+    for i in range(10):
+        await ManyToOneModel.async_objects.create(field=await BasicModel.async_objects.create(field=f"field_{i}"))
+    instances = await ManyToOneModel.async_objects.all().order_by("pk").query()
+    other = await ManyToOneModel.async_objects.get(pk=instances[0].pk)
+
+    queries.clear()
+    hops.clear()
+    with use_relation_loader():
+        # the loads of the same tick are resolved with one pk__in query in one hop
+        values = await asyncio.gather(*[get_value_from_db_instance(instance, "field") for instance in instances])
+        assert [value.field for value in values] == [f"field_{i}" for i in range(10)]
+        assert (len(queries), len(hops)) == (1, 1)
+
+        # the loaded values are cached for the lifetime of the loader
+        assert (await get_value_from_db_instance(other, "field")) is values[0]
+        assert (len(queries), len(hops)) == (1, 1)
+
+    instances = await ManyToOneModel.async_objects.all().order_by("pk").query()
+    queries.clear()
+    hops.clear()
+    with use_relation_loader():
+        # the items serialized one by one share the hops of their reads
+        results = await asyncio.gather(
+            *[serializers.serialize_django_models([instance], ManyToOneValidator) for instance in instances]
+        )
+    assert [result["field"]["field"] for result, in results] == [f"field_{i}" for i in range(10)]
+    assert (len(queries), len(hops)) == (1, 2)
+
+
+class HookValidator(PydanticModel):
+    ids: List[int]
+    field: str
+
+    @staticmethod
+    async def serialize_field(raw_data, context):
+        return raw_data["field"].upper()
+
+
+def test_rest_validator_metadata():
+    metadata = get_validator_metadata(BasicRelationsValidator)
+    assert metadata is get_validator_metadata(BasicRelationsValidator)
+    assert metadata["list_fields"] == {"manytoonemodel_set", "manytomanymodel_set"}
+    assert metadata["nested"] == {
+        "manytoonemodel_set": (ManyToOneIdValidator, True),
+        "manytomanymodel_set": (ManyToManyValidator, True),
+    }
+    assert set(metadata["definitions"]) == {"ManyToOneIdValidator", "ManyToManyValidator", "BasicValidator"}
+    assert get_validator_metadata(HookValidator)["hooks"] == {
+        "clean": {},
+        "serialize": {"field": HookValidator.serialize_field},
+    }
+
+
+@pytest.mark.asyncio
+async def test_rest_validator_metadata_hooks():
+    assert clean_params(HookValidator, QueryDict("ids=1&ids=2&field=a")) == {"ids": ["1", "2"], "field": "a"}
+    assert await enrich_body(HookValidator, "serialize", {"ids": [], "field": "a"}, {}) == {"ids": [], "field": "A"}
+
+
+def test_rest_values_plan():
+    assert get_values_plan(ManyToOneValidator, ManyToOneModel) == {
+        "columns": ["id", "field_id", "field__id", "field__field"],
+        "tree": [("id", 0, None), ("field", 1, [("id", 2, None), ("field", 3, None)])],
+    }
+    assert get_values_plan(ManyToOneIdValidator, ManyToOneModel)["columns"] == ["id", "field_id"]
+    assert get_values_plan(ManyToManyValidator, ManyToManyModel) is None
+    assert get_values_plan(BasicRelationsValidator, BasicModel) is None
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_values(queries):
+    for i in range(10):
+        await ManyToOneModel.async_objects.create(field=await BasicModel.async_objects.create(field=f"field_{i}"))
+
+    @rest_view(["GET"])
+    @serialize_response(ManyToOneValidator, values=True)
+    async def view(request):
+        return 200, ManyToOneModel.async_objects.all().order_by("pk")
+
+    queries.clear()
+    response = await view(RequestFactory().get("/"))
+
+    results = json.loads(response.content)["results"]
+    assert [result["field"]["field"] for result in results] == [f"field_{i}" for i in range(10)]
+    assert results[0] == {"id": results[0]["id"], "field": {"id": results[0]["field"]["id"], "field": "field_0"}}
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_rest_values_fallback():
+    m2m_model = await ManyToManyModel.async_objects.create()
+    await m2m_model.async_field.add(await BasicModel.async_objects.create(field="field"))
+
+    @rest_view(["GET"])
+    @serialize_response(ManyToManyValidator, values=True)
+    async def view(request):
+        return 200, ManyToManyModel.async_objects.all()
+
+    response = await view(RequestFactory().get("/"))
+
+    assert json.loads(response.content)["results"][0]["field"][0]["field"] == "field"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "trusted, sample_rate, debug, status_code",
+    [
+        (False, 0.0, False, 406),
+        (True, 0.0, False, 200),
+        (True, 1.0, False, 406),
+        (True, 0.0, True, 406),
+    ],
+)
+async def test_rest_trusted_output(settings, trusted, sample_rate, debug, status_code):
+    settings.DEBUG = debug
+
+    @rest_view(["GET"])
+    @serialize_response(BasicValidator, trusted=trusted, sample_rate=sample_rate)
+    async def view(request):
+        return 200, {"results": [{"id": "invalid", "field": "field"}]}
+
+    response = await view(RequestFactory().get("/"))
+
+    assert response.status_code == status_code
+
+
+@pytest.mark.asyncio
+async def test_rest_trusted_output_setting(monkeypatch):
+    monkeypatch.setattr(core, "REST_ASYNC_TRUSTED_OUTPUT", True)
+
+    @rest_view(["GET"])
+    @serialize_response(BasicValidator)
+    async def view(request):
+        return 200, {"id": "invalid", "field": "field"}
+
+    response = await view(RequestFactory().get("/"))
+
+    assert json.loads(response.content) == {"id": "invalid", "field": "field"}
+
+
+@pytest.mark.parametrize("name", list(codecs.CODECS))
+def test_rest_json_codecs(name):
+    if codecs.CODECS[name][1] is None:
+        pytest.skip(f"{name} is not installed")
+    codec = codecs.get_json_codec(name)
+    data = {
+        "datetime": datetime.datetime(2020, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+        "date": datetime.date(2020, 1, 2),
+        "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "decimal": Decimal("1.10"),
+        "text": "тест",
+        1: [None, True, 1.5],
+    }
+
+    encoded = codec.dumps(data)
+
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == json.loads(codecs.get_json_codec("stdlib").dumps(data))
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads(b"{")
+
+
+@pytest.mark.asyncio
+async def test_rest_json_codec_setting(monkeypatch):
+    if codecs.orjson is None:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(codecs, "REST_ASYNC_JSON_CODEC", "orjson")
+
+    @rest_view(["POST"])
+    @clean_request_body(BasicValidator)
+    async def view(request, body):
+        return 200, body
+
+    response = await view(RequestFactory().post("/", b'{"id": 1, "field": "field"}', content_type="application/json"))
+    assert isinstance(response, JsonResponse)
+    assert json.loads(response.content) == {"id": 1, "field": "field"}
+
+    response = await view(RequestFactory().post("/", b"{", content_type="application/json"))
+    assert response.status_code == 400
+    assert isinstance(Response({}), JsonResponse)
+
+
+def test_rest_response_json_dumps_params():
+    class Encoder(json.JSONEncoder):
+        def default(self, o):
+            return sorted(o) if isinstance(o, set) else super().default(o)
+
+    response = Response({"b": {2, 1}, "a": 1}, encoder=Encoder, json_dumps_params={"sort_keys": True})
+    assert response.content == b'{"a": 1, "b": [1, 2]}'
+    assert Response({"a": "\u00e9"}, json_dumps_params={"ensure_ascii": False}).content == '{"a": "\u00e9"}'.encode()
+    with pytest.raises(ValueError):
+        Response({}, encoder=Encoder, codec="stdlib")
+
+
+@pytest.mark.asyncio
+async def test_rest_view_coalesce():
+    event = asyncio.Event()
+    calls = []
+
+    @rest_view(["GET", "POST"], coalesce=True)
+    async def view(request):
+        calls.append(request.get_full_path())
+        await event.wait()
+        return 200, {"path": request.get_full_path()}
+
+    factory = RequestFactory()
+    requests = [
+        factory.get("/?page=1"),
+        factory.get("/?page=1"),
+        factory.get("/?page=2"),
+        factory.get("/?page=1", HTTP_AUTHORIZATION="Token other"),
+        factory.post("/?page=1"),
+    ]
+    responses = asyncio.gather(*[view(request) for request in requests])
+    await asyncio.sleep(0)
+    event.set()
+    responses = await responses
+
+    assert [json.loads(response.content)["path"] for response in responses] == [
+        "/?page=1",
+        "/?page=1",
+        "/?page=2",
+        "/?page=1",
+        "/?page=1",
+    ]
+    assert len(calls) == 4
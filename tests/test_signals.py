@@ -0,0 +1,252 @@
+import asyncio
+import gc
+import warnings
+
+import pytest
+
+from django.db import connection
+from django.dispatch.dispatcher import NO_RECEIVERS
+
+from django_rest_async.db import signals
+from django_rest_async.db.signals import AsyncModelSignal, drain_signals
+
+from .models import BasicModel, ManyToManyModel
+
+
+@pytest.mark.asyncio
+async def test_signal_no_receivers(monkeypatch):
+    signal = AsyncModelSignal(use_caching=True)
+
+    async def receiver(**kwargs):
+        pass
+
+    signal.connect(receiver, sender=BasicModel)
+    assert await signal.async_send(sender=object) == []
+    assert signal.sender_receivers_cache.get(object) is NO_RECEIVERS
+
+    def live_receivers(sender):
+        raise AssertionError("the receivers cache is not used")
+
+    monkeypatch.setattr(signal, "_live_receivers", live_receivers)
+    assert await signal.async_send(sender=object) == []
+
+
+@pytest.mark.asyncio
+async def test_signal_concurrent_and_ordered():
+    signal = AsyncModelSignal(use_caching=True)
+    event = asyncio.Event()
+    calls = []
+
+    async def waiting_receiver(**kwargs):
+        calls.append("waiting")
+        await asyncio.wait_for(event.wait(), 1)
+        return "waiting"
+
+    async def setting_receiver(**kwargs):
+        calls.append("setting")
+        event.set()
+        return "setting"
+
+    signal.connect(waiting_receiver, weak=False)
+    signal.connect(setting_receiver, weak=False)
+
+    responses = await signal.async_send(sender=BasicModel)
+    assert [response for _, response in responses] == ["waiting", "setting"]
+
+    event.clear()
+    calls.clear()
+    with pytest.raises(asyncio.TimeoutError):
+        await signal.async_send(sender=BasicModel, ordered=True)
+    assert calls == ["waiting"]
+
+
+@pytest.mark.asyncio
+async def test_signal_isolate_errors():
+    signal = AsyncModelSignal(use_caching=True)
+
+    async def failing_receiver(**kwargs):
+        raise ValueError("failed")
+
+    async def receiver(**kwargs):
+        return "ok"
+
+    signal.connect(failing_receiver, weak=False)
+    signal.connect(receiver, weak=False)
+
+    with pytest.raises(ValueError):
+        await signal.async_send(sender=BasicModel)
+    responses = await signal.async_send(sender=BasicModel, isolate_errors=True)
+    assert isinstance(responses[0][1], ValueError)
+    assert responses[1][1] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_signal_background(monkeypatch):
+    monkeypatch.setattr(signals, "REST_ASYNC_SIGNAL_BACKGROUND_LIMIT", 2)
+    signal = AsyncModelSignal(use_caching=True, dispatch="background")
+    event = asyncio.Event()
+    done = []
+
+    async def receiver(**kwargs):
+        await event.wait()
+        done.append(kwargs["value"])
+        raise ValueError("isolated")
+
+    signal.connect(receiver, weak=False)
+
+    assert await signal.async_send(sender=BasicModel, value=1) == []
+    assert await signal.async_send(sender=BasicModel, value=2) == []
+    # the limit is reached: the third dispatch waits for a running one
+    third = asyncio.ensure_future(signal.async_send(sender=BasicModel, value=3))
+    await asyncio.sleep(0.01)
+    assert not third.done()
+    cancelled = asyncio.ensure_future(signal.async_send(sender=BasicModel, value=0))
+    await asyncio.sleep(0)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        cancelled.cancel()
+        await asyncio.wait([cancelled])
+        assert cancelled.cancelled()
+        del cancelled
+        gc.collect()
+    # the receivers of a cancelled dispatch are never called, their coroutine is never created
+    assert not [warning for warning in caught if issubclass(warning.category, RuntimeWarning)]
+
+    event.set()
+    assert await third == []
+    await drain_signals()
+    assert sorted(done) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        await signal.async_send(sender=BasicModel, dispatch="inline", value=4)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_signal_post_save_created():
+    created = []
+
+    async def receiver(instance, **kwargs):
+        created.append(kwargs["created"])
+
+    signals.async_post_save.connect(receiver, sender=BasicModel)
+    try:
+        model = BasicModel(field="field")
+        await model.async_save()
+        model.field = "changed"
+        await model.async_save()
+    finally:
+        signals.async_post_save.disconnect(receiver, sender=BasicModel)
+
+    assert created == [True, False]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@pytest.mark.parametrize("returns_pks", [True, False])
+async def test_signal_bulk_save_and_delete(monkeypatch, returns_pks):
+    if not returns_pks:
+        features = type(connection.features)
+        monkeypatch.setattr(features, "can_return_rows_from_bulk_insert", False)
+    sent = []
+
+    async def receiver(signal, instances, **kwargs):
+        sent.append((signal, len(instances), kwargs.get("created")))
+
+    bulk_signals = [
+        signals.async_pre_bulk_save,
+        signals.async_post_bulk_save,
+        signals.async_pre_bulk_delete,
+        signals.async_post_bulk_delete,
+    ]
+    for signal in bulk_signals:
+        signal.connect(receiver, sender=BasicModel)
+    try:
+        existing = await BasicModel.async_objects.create(field="existing")
+        existing.field = "changed"
+        objs = [existing, *[BasicModel(field=f"field_{i}") for i in range(4)]]
+
+        created = await BasicModel.async_objects.bulk_save(objs, batch_size=2)
+        assert created == [False, True, True, True, True]
+        assert all(obj.pk for obj in objs)
+        assert sorted(await BasicModel.async_objects.all().values_list("field", flat=True)) == [
+            "changed",
+            *[f"field_{i}" for i in range(4)],
+        ]
+
+        assert (await BasicModel.async_objects.bulk_delete(objs[:3], batch_size=2))[0] == 3
+        assert await BasicModel.async_objects.count() == 2
+    finally:
+        for signal in bulk_signals:
+            signal.disconnect(receiver, sender=BasicModel)
+
+    assert sent == [
+        (signals.async_pre_bulk_save, 5, [False, True, True, True, True]),
+        (signals.async_post_bulk_save, 5, [False, True, True, True, True]),
+        (signals.async_pre_bulk_delete, 3, None),
+        (signals.async_post_bulk_delete, 3, None),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_signal_m2m_set():
+    sent = []
+
+    async def receiver(action, instance, pk_set, **kwargs):
+        sent.append((action, instance.pk, pk_set and sorted(pk_set)))
+
+    signals.async_m2m_changed.connect(receiver, sender=ManyToManyModel.field.through)
+    try:
+        models = [await BasicModel.async_objects.create(field=str(i)) for i in range(3)]
+        m2m_model = await ManyToManyModel.async_objects.create()
+        await m2m_model.async_field.add(models[0], models[1])
+        sent.clear()
+
+        await m2m_model.async_field.set([models[1], models[2]])
+        # the writes run in one transaction, the signals are sent around it
+        assert sent == [
+            ("pre_remove", m2m_model.pk, [models[0].pk]),
+            ("pre_add", m2m_model.pk, [models[2].pk]),
+            ("post_remove", m2m_model.pk, [models[0].pk]),
+            ("post_add", m2m_model.pk, [models[2].pk]),
+        ]
+        sent.clear()
+
+        await m2m_model.async_field.set([models[0]], clear=True)
+        assert [action for action, _, _ in sent] == ["pre_clear", "pre_add", "post_clear", "post_add"]
+        assert [m.pk for m in await m2m_model.async_field.all().query()] == [models[0].pk]
+        sent.clear()
+
+        await ManyToManyModel.async_objects.m2m_bulk_set("field", {m2m_model.pk: [models[1].pk]})
+        # the bulk api does not send the per instance signal
+        assert sent == []
+    finally:
+        signals.async_m2m_changed.disconnect(receiver, sender=ManyToManyModel.field.through)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_signal_m2m_bulk_changed():
+    sent = []
+
+    async def receiver(action, pk_set, pk_map, **kwargs):
+        sent.append((action, pk_map, sorted(pk_set)))
+
+    signals.async_m2m_bulk_changed.connect(receiver, sender=ManyToManyModel.field.through)
+    try:
+        models = [await BasicModel.async_objects.create(field=str(i)) for i in range(3)]
+        m2m_model = await ManyToManyModel.async_objects.create()
+        await m2m_model.async_field.add(models[0])
+        assert sent == []
+
+        await ManyToManyModel.async_objects.m2m_bulk_set("field", {m2m_model.pk: [models[1].pk, models[2].pk]}, 1)
+        assert sent == [
+            ("pre_remove", {m2m_model.pk: {models[0].pk}}, [models[0].pk]),
+            ("post_remove", {m2m_model.pk: {models[0].pk}}, [models[0].pk]),
+            ("pre_add", {m2m_model.pk: {models[1].pk}}, [models[1].pk]),
+            ("post_add", {m2m_model.pk: {models[1].pk}}, [models[1].pk]),
+            ("pre_add", {m2m_model.pk: {models[2].pk}}, [models[2].pk]),
+            ("post_add", {m2m_model.pk: {models[2].pk}}, [models[2].pk]),
+        ]
+    finally:
+        signals.async_m2m_bulk_changed.disconnect(receiver, sender=ManyToManyModel.field.through)